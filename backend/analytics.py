@@ -0,0 +1,124 @@
+"""
+Inquiry counts per day, by status and by course.
+
+The counters follow the storage backend's change events for the
+inquiries, so creates, bulk imports, status changes and deletes are all
+O(1) and a stats request only touches the days it covers, found by binary
+search over the sorted list of days. Days are calendar days at a fixed
+offset from UTC. A record's course and creation time are never edited,
+so only its current status is remembered to move it between statuses.
+"""
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+class DayCounts:
+    __slots__ = ("total", "status", "course")
+
+    def __init__(self):
+        self.total = 0
+        self.status: Dict[str, int] = {}
+        self.course: Dict[str, int] = {}
+
+    def add(self, status: str, course: str, sign: int) -> None:
+        self.total += sign
+        _bump(self.status, status, sign)
+        _bump(self.course, course, sign)
+
+    def merge(self, other: "DayCounts") -> None:
+        self.total += other.total
+        for status, count in other.status.items():
+            _bump(self.status, status, count)
+        for course, count in other.course.items():
+            _bump(self.course, course, count)
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "status": _by_count(self.status),
+            "course": _by_count(self.course),
+        }
+
+
+def _bump(counts: Dict[str, int], key: str, delta: int) -> None:
+    count = counts.get(key, 0) + delta
+    if count:
+        counts[key] = count
+    else:
+        counts.pop(key, None)
+
+
+def _by_count(counts: Dict[str, int]) -> Dict[str, int]:
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+class InquiryStats:
+    def __init__(self, utc_offset_minutes: int = 0):
+        self.tz = timezone(timedelta(minutes=utc_offset_minutes))
+        self.days: Dict[date, DayCounts] = {}
+        # Days with at least one inquiry, ascending
+        self._order: List[date] = []
+        # id -> current status
+        self._status: Dict[str, str] = {}
+
+    def watch(self, storage, name: str = "inquiries") -> None:
+        def on_change(op, record, changes):
+            record_id = record["id"]
+            if op == "insert":
+                if record_id in self._status:
+                    self._add(record, self._status.pop(record_id), -1)
+                self._status[record_id] = record.get("status")
+                self._add(record, record.get("status"), 1)
+            elif op == "delete":
+                if record_id in self._status:
+                    self._add(record, self._status.pop(record_id), -1)
+            elif "status" in changes and record_id in self._status:
+                self._add(record, self._status[record_id], -1)
+                self._status[record_id] = changes["status"]
+                self._add(record, changes["status"], 1)
+
+        storage.subscribe(name, on_change)
+
+    def day(self, created_at: datetime) -> date:
+        return created_at.astimezone(self.tz).date()
+
+    def _add(self, record: dict, status: str, sign: int) -> None:
+        day = self.day(record["created_at"])
+        counts = self.days.get(day)
+        if counts is None:
+            counts = self.days[day] = DayCounts()
+            insort(self._order, day)
+        counts.add(status, record.get("course_interested"), sign)
+        if not counts.total:
+            del self.days[day]
+            del self._order[bisect_left(self._order, day)]
+
+    def summary(self, bucket: str = "day", since: Optional[date] = None, until: Optional[date] = None) -> dict:
+        """Counts per ``bucket`` for the days in ``[since, until)``, plus their totals."""
+        order = self._order
+        lo = bisect_left(order, since) if since is not None else 0
+        hi = bisect_left(order, until) if until is not None else len(order)
+        buckets: Dict[date, DayCounts] = {}
+        overall = DayCounts()
+        for day in order[lo:hi]:
+            counts = self.days[day]
+            start = bucket_start(day, bucket)
+            merged = buckets.get(start)
+            if merged is None:
+                merged = buckets[start] = DayCounts()
+            merged.merge(counts)
+            overall.merge(counts)
+        return {
+            "bucket": bucket,
+            **overall.as_dict(),
+            "buckets": [{"start": start.isoformat(), **counts.as_dict()} for start, counts in buckets.items()],
+        }
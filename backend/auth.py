@@ -0,0 +1,82 @@
+"""
+Admin password hashing and session tokens.
+
+bcrypt is deliberately slow, so hashing and checking run in a small
+dedicated thread pool instead of on the event loop. Issued tokens live in
+an in-memory TTL store so admin-only routes validate them with a dict
+lookup. bcrypt itself is imported by the pool threads on first use.
+"""
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bcrypt")
+
+
+def _hash(password: str) -> str:
+    import bcrypt
+
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def _check(password: str, password_hash: str) -> bool:
+    import bcrypt
+
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, _hash, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, _check, password, password_hash)
+
+
+class SessionStore:
+    def __init__(self, ttl: float = 12 * 60 * 60, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        # token -> (admin id, username, expiry); sessions get the same TTL,
+        # so insertion order is (close to) expiry order.
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def issue(self, admin_id: str, username: str) -> Tuple[str, float]:
+        """Create a session, returning the token and its expiry (epoch seconds)."""
+        token = secrets.token_urlsafe(32)
+        expires_at = time.time() + self.ttl
+        self.put(token, admin_id, username, expires_at)
+        return token, expires_at
+
+    def put(self, token: str, admin_id: str, username: str, expires_at: float) -> None:
+        self._purge(time.time())
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+        self._sessions[token] = (admin_id, username, expires_at)
+
+    def get(self, token: str) -> Optional[dict]:
+        session = self._sessions.get(token)
+        if session is None:
+            return None
+        admin_id, username, expires_at = session
+        if expires_at <= time.time():
+            del self._sessions[token]
+            return None
+        return {"id": admin_id, "username": username}
+
+    def revoke(self, token: str) -> bool:
+        return self._sessions.pop(token, None) is not None
+
+    def _purge(self, now: float) -> None:
+        sessions = self._sessions
+        while sessions:
+            token, session = next(iter(sessions.items()))
+            if session[2] > now:
+                break
+            del sessions[token]
@@ -0,0 +1,138 @@
+"""
+Streaming bulk import of NDJSON or CSV request bodies.
+
+The body is decoded chunk by chunk and split into rows as it arrives, each
+row is validated on its own, and valid records are inserted in batches, so
+an import never holds the whole file in memory and one bad row only costs
+an entry in the error report.
+"""
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Tuple
+
+from pydantic import ValidationError
+
+MAX_LINE_BYTES = 1024 * 1024
+CSV_LIST_SEPARATOR = "|"
+
+
+class RowTooLarge(Exception):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if len(pending) > MAX_LINE_BYTES:
+            raise RowTooLarge(f"Row exceeds {MAX_LINE_BYTES} bytes")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield ``(row number, object)`` pairs, or ``(row number, exception)`` for undecodable lines."""
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except ValueError as e:
+            yield row, e
+
+
+async def csv_rows(chunks: AsyncIterator[bytes], list_fields: Iterable[str] = ()) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield ``(row number, dict)`` pairs keyed by the header row. Fields in
+    ``list_fields`` are split on ``|``.
+    """
+    list_fields = set(list_fields)
+    header = None
+    row = 0
+    record = ""
+    async for line in iter_lines(chunks):
+        record += line
+        # A quoted field may span lines; wait until the quotes balance
+        if record.count('"') % 2:
+            if len(record) > MAX_LINE_BYTES:
+                raise RowTooLarge(f"Row exceeds {MAX_LINE_BYTES} bytes")
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        item = {}
+        for name, value in zip(header, values):
+            if name in list_fields:
+                item[name] = [part.strip() for part in value.split(CSV_LIST_SEPARATOR) if part.strip()]
+            elif value != "":
+                item[name] = value
+        yield row, item
+    if record.strip():
+        row += 1
+        yield row, ValueError("Unterminated quoted field")
+
+
+async def import_rows(
+    rows: AsyncIterator[Tuple[int, Any]],
+    build: Callable[[Any], dict],
+    insert_batch: Callable[[List[dict]], Awaitable[None]],
+    batch_size: int = 500,
+    max_errors: int = 100,
+) -> dict:
+    """
+    Validate each row with ``build`` and hand valid records to
+    ``insert_batch`` ``batch_size`` at a time. Returns the import report.
+    """
+    inserted = 0
+    failed = 0
+    errors = []
+    batch: List[dict] = []
+
+    def reject(row: int, detail) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < max_errors:
+            errors.append({"row": row, "errors": detail})
+
+    async for row, item in rows:
+        if isinstance(item, Exception):
+            reject(row, [str(item)])
+            continue
+        if not isinstance(item, dict):
+            reject(row, ["Expected a JSON object"])
+            continue
+        try:
+            batch.append(build(item))
+        except ValidationError as e:
+            reject(row, [f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()])
+            continue
+        if len(batch) >= batch_size:
+            await insert_batch(batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        await insert_batch(batch)
+        inserted += len(batch)
+
+    return {
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
@@ -0,0 +1,88 @@
+"""
+Cache of fully encoded responses for read-mostly endpoints.
+
+Entries are grouped per collection and keyed by the request's filter and
+paging parameters. Any mutation the storage backend announces for a
+watched collection drops all of its entries, so a cached body is always
+the one the current data would produce. Each entry carries a strong ETag so clients can revalidate with
+``If-None-Match`` and get a 304 without the data being touched.
+
+Compressed variants of a body are made on first request for each encoding
+and kept on the entry, so they too are computed once per data version.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional
+
+from compression import CACHED_LEVELS, compress
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+    # encoding -> compressed body
+    encoded: Dict[str, bytes]
+
+    def encode(self, encoding: str) -> bytes:
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding, CACHED_LEVELS[encoding])
+        return body
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """A compressed variant's ETag; strong ETags must differ between encodings."""
+    return etag[:-1] + "-" + encoding + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip() == etag for candidate in if_none_match.split(","))
+
+
+def cached(body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+    etag = make_etag(body)
+    return CachedResponse(body, etag, {**(headers or {}), "ETag": etag, "Vary": "Accept-Encoding"}, {})
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.versions: Dict[str, int] = {}
+        self._entries: Dict[str, "OrderedDict[Hashable, CachedResponse]"] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def watch(self, name: str, storage) -> None:
+        self.versions.setdefault(name, 0)
+        storage.subscribe(name, lambda op, record, changes: self.invalidate(name))
+
+    def invalidate(self, name: str) -> None:
+        self.versions[name] = self.versions.get(name, 0) + 1
+        self._entries.pop(name, None)
+
+    def get(self, name: str, key: Hashable) -> Optional[CachedResponse]:
+        entries = self._entries.get(name)
+        entry = entries.get(key) if entries is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+        entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, name: str, key: Hashable, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        entry = cached(body, headers)
+        entries = self._entries.setdefault(name, OrderedDict())
+        entries[key] = entry
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return entry
@@ -0,0 +1,113 @@
+"""
+gzip and Brotli for JSON responses.
+
+The encoding is negotiated from ``Accept-Encoding``, preferring Brotli
+when the ``brotli`` package is installed and the client weighs it at
+least as high as gzip. Bodies under ``MINIMUM_SIZE`` bytes go out as they
+are: the framing would eat most of the saving.
+
+``CompressionMiddleware`` handles ordinary JSON responses per request.
+Streamed responses (exports, the event feed) and responses that already
+carry a ``Content-Encoding`` pass through untouched, which is how the
+cached list endpoints serve bytes compressed once per data version.
+"""
+import gzip
+from functools import lru_cache
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MINIMUM_SIZE = 1024
+
+# Levels for bodies compressed on every request, and for cached bodies
+# compressed once per version (Brotli's top qualities cost ~20x more CPU
+# for a few percent, so neither goes there)
+DYNAMIC_LEVELS = {"gzip": 5, "br": 4}
+CACHED_LEVELS = {"gzip": 9, "br": 9}
+
+SUPPORTED = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+@lru_cache(maxsize=128)
+def accepted_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The encoding to use for a request's ``Accept-Encoding``, ``None`` for identity."""
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in SUPPORTED:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=DYNAMIC_LEVELS["br"] if level is None else level)
+    # mtime=0 keeps the output identical across calls and workers
+    return gzip.compress(body, DYNAMIC_LEVELS["gzip"] if level is None else level, mtime=0)
+
+
+def add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if vary is None:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = vary + ", Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing single-message JSON responses."""
+
+    def __init__(self, app, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding"))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            response_start, start = start, None
+            headers = MutableHeaders(scope=response_start)
+            if not headers.get("content-type", "").startswith("application/json") or "content-encoding" in headers:
+                await send(response_start)
+                await send(message)
+                return
+            add_vary(headers)
+            body = message.get("body", b"")
+            if encoding is not None and not message.get("more_body") and len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                message = {**message, "body": body}
+            await send(response_start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
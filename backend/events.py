@@ -0,0 +1,118 @@
+"""
+In-process pub/sub behind the live change feed.
+
+Storage change events for the watched collections get a monotonic
+version and are encoded once, then kept in a bounded history. Subscribers
+don't get a queue each: they wait on one shared ``asyncio.Event`` that is
+swapped on every publish and then read the history past the last version
+they saw. An idle connection is a single suspended coroutine, and a
+publish costs the same with one listener as with hundreds.
+
+Event ids are ``<epoch>-<version>``, where the epoch is unique to this
+process. A client reconnecting with its last id resumes from the history.
+If it is too far behind, or its id came from another process, it gets a
+``reset`` event and should reload.
+"""
+import asyncio
+import secrets
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Collection, Deque, List, NamedTuple, Optional
+
+import encoding
+
+
+class Event(NamedTuple):
+    version: int
+    name: str
+    # JSON payload, and the same payload as a complete SSE frame
+    data: bytes
+    frame: bytes
+
+
+class EventHub:
+    def __init__(self, history: int = 1000, heartbeat: float = 15.0):
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.heartbeat = heartbeat
+        self.live = False
+        self._history: Deque[Event] = deque(maxlen=history)
+        self._changed: Optional[asyncio.Event] = None
+        self.subscribers = 0
+
+    def watch(self, name: str, storage) -> None:
+        def on_change(op, record, changes):
+            # Records loaded at startup are not news
+            if self.live:
+                self.publish(name, {"op": op, "id": record.get("id"), "record": record, "changes": changes})
+
+        storage.subscribe(name, on_change)
+
+    def start(self) -> None:
+        self.live = True
+
+    def event(self, name: str, payload: dict) -> Event:
+        event_id = f"{self.epoch}-{self.version}"
+        data = encoding.dumps({"event_id": event_id, "version": self.version, "collection": name, **payload})
+        frame = f"id: {event_id}\nevent: {name}\ndata: ".encode() + data + b"\n\n"
+        return Event(self.version, name, data, frame)
+
+    def publish(self, name: str, payload: dict) -> None:
+        self.version += 1
+        self._history.append(self.event(name, payload))
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def since(self, version: int) -> Optional[List[Event]]:
+        """Events after ``version``, or ``None`` if the history no longer reaches back that far."""
+        if version >= self.version:
+            return []
+        history = self._history
+        if not history or history[0].version > version + 1:
+            return None
+        return list(islice(history, version + 1 - history[0].version, None))
+
+    def resume_point(self, last_event_id: Optional[str]) -> Optional[int]:
+        """The version a client's last event id resumes from, ``None`` if it can't resume."""
+        epoch, _, version = (last_event_id or "").partition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return min(int(version), self.version)
+
+    def _wait(self):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed.wait()
+
+    async def follow(self, last_event_id: Optional[str] = None, collections: Optional[Collection[str]] = None) -> AsyncIterator[List[Event]]:
+        """
+        Yield batches of new events for ``collections`` (all if ``None``)
+        as they are published, and an empty batch when a heartbeat is due.
+        """
+        version = self.resume_point(last_event_id)
+        self.subscribers += 1
+        try:
+            if version is None:
+                version = self.version
+                if last_event_id:
+                    yield [self.event("reset", {})]
+            while True:
+                events = self.since(version)
+                if events is None:
+                    version = self.version
+                    yield [self.event("reset", {})]
+                    continue
+                if events:
+                    version = events[-1].version
+                    if collections is not None:
+                        events = [event for event in events if event.name in collections]
+                    if events:
+                        yield events
+                    continue
+                try:
+                    await asyncio.wait_for(self._wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield []
+        finally:
+            self.subscribers -= 1
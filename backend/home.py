@@ -0,0 +1,77 @@
+"""
+The landing page's data as one ready-encoded response.
+
+``HomeFeed`` holds the encoded body, its ETag and its compressed variants
+in memory. A change to any watched collection marks it stale and
+schedules one rebuild on the event loop; changes arriving while a rebuild
+runs fold into a single follow-up rebuild, so a bulk import costs two
+builds rather than one per row. Requests made while a rebuild is pending
+wait for it instead of getting data from before their own write.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from cache import CachedResponse, cached
+
+logger = logging.getLogger(__name__)
+
+
+class HomeFeed:
+    def __init__(self, build: Callable[[], Awaitable[bytes]], headers: Optional[Dict[str, str]] = None):
+        self.build = build
+        self.headers = headers or {}
+        self.entry: Optional[CachedResponse] = None
+        self.version = 0
+        # Version the current entry was built from
+        self.built = -1
+        self.builds = 0
+        self.live = False
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, name: str, storage) -> None:
+        storage.subscribe(name, lambda op, record, changes: self.stale())
+
+    async def start(self) -> None:
+        self.live = True
+        await self.get()
+
+    def stale(self) -> None:
+        self.version += 1
+        # Records loaded at startup are covered by the first build; changes
+        # made off the event loop are picked up by the next get()
+        if self.live:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._schedule()
+
+    def _schedule(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._rebuild())
+        return self._task
+
+    async def _rebuild(self) -> None:
+        try:
+            while True:
+                version = self.version
+                try:
+                    body = await self.build()
+                except Exception as e:
+                    logger.error(f"Failed to build home payload: {str(e)}")
+                    return
+                self.builds += 1
+                self.entry = cached(body, self.headers)
+                self.built = version
+                if self.version == version:
+                    return
+        finally:
+            self._task = None
+
+    async def get(self) -> CachedResponse:
+        if self._task is not None or self.built != self.version:
+            await asyncio.shield(self._schedule())
+        if self.entry is None:
+            raise RuntimeError("Home payload is not available")
+        return self.entry
@@ -0,0 +1,234 @@
+"""
+``Idempotency-Key`` support for the create endpoints.
+
+A client retrying a POST sends the same key. The first request runs as
+usual and its successful response is remembered under (path, key) for
+``ttl`` seconds. A retry gets the remembered status, headers and body
+back with ``Idempotent-Replayed: true``, before any validation, insert or
+notification happens. A retry arriving while the first is still running
+waits for it: if the first succeeds the retry gets the same response, so
+duplicates in flight run once; otherwise the retry runs itself. Reusing a
+key with a different body is rejected with a 422.
+
+Only 2xx responses are remembered, so a request that was rate limited or
+failed can be retried with the same key. The store is per process and
+bounded like the rate limiters: least recently used keys are evicted
+past ``max_keys``.
+
+With ``shared`` storage (SQLite under ``uvicorn --workers N``) a key is
+also claimed in the database before the request runs, and successful
+responses are written there, so a retry that lands on another worker
+waits for the first to finish and is then answered with its response. A
+claim is held for at most ``lease`` seconds, after which a worker that
+died mid-request no longer blocks the key.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Collection, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+import orjson
+
+import encoding
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: bytes
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+def _encode_headers(headers: List[Tuple[bytes, bytes]]) -> bytes:
+    return encoding.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers])
+
+
+def _decode_headers(data: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in orjson.loads(data)]
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float = 86400, max_keys: int = 10000, shared=None, lease: float = 60.0, poll_interval: float = 0.05):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        # A storage backend keeping keys for all workers, see storage.py
+        self.shared = shared
+        self.lease = lease
+        self.poll_interval = poll_interval
+        # key -> (response, expiry time), least recently used first
+        self._responses: "OrderedDict[Hashable, Tuple[StoredResponse, float]]" = OrderedDict()
+        # key -> the stored response of the request running under it, None if it didn't succeed
+        self.pending: Dict[Hashable, "asyncio.Future[Optional[StoredResponse]]"] = {}
+        self.replays = 0
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def get(self, key: Hashable) -> Optional[StoredResponse]:
+        item = self._responses.get(key)
+        if item is None:
+            return None
+        response, expires = item
+        if expires <= time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return response
+
+    def put(self, key: Hashable, response: StoredResponse) -> None:
+        self._responses[key] = (response, time.monotonic() + self.ttl)
+        self._responses.move_to_end(key)
+        if len(self._responses) > self.max_keys:
+            self._responses.popitem(last=False)
+
+    async def claim(self, key: Tuple[str, str], fingerprint: bytes) -> Optional[StoredResponse]:
+        """
+        None once this process holds ``key`` in the shared storage, else the
+        response another worker stored under it, waiting for that worker
+        if its request is still running.
+        """
+        if self.shared is None:
+            return None
+        while True:
+            row = await self.shared.claim_idempotency_key(*key, fingerprint, time.time() + self.lease)
+            if row is None:
+                return None
+            stored_fingerprint, status, headers, body = row
+            if status is not None:
+                response = StoredResponse(stored_fingerprint, status, _decode_headers(headers), body)
+                self.put(key, response)
+                return response
+            await asyncio.sleep(self.poll_interval)
+
+    async def save(self, key: Tuple[str, str], response: StoredResponse) -> None:
+        self.put(key, response)
+        if self.shared is not None:
+            headers = _encode_headers(response.headers)
+            await self.shared.save_idempotent_response(
+                *key, response.fingerprint, response.status, headers, response.body, time.time() + self.ttl
+            )
+
+    async def release(self, key: Tuple[str, str]) -> None:
+        if self.shared is not None:
+            await self.shared.release_idempotency_key(*key)
+
+
+def _error(status: int, detail: str) -> StoredResponse:
+    body = encoding.dumps({"detail": detail})
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    return StoredResponse(b"", status, headers, body)
+
+
+async def _send_response(send, response: StoredResponse, replayed: bool) -> None:
+    headers = response.headers
+    if replayed:
+        headers = headers + [(REPLAYED_HEADER.lower().encode(), b"true")]
+    await send({"type": "http.response.start", "status": response.status, "headers": headers})
+    await send({"type": "http.response.body", "body": response.body})
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware applying an ``IdempotencyStore`` to POSTs on ``paths``."""
+
+    def __init__(self, app, store: IdempotencyStore, paths: Collection[str]):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = None
+        for name, value in scope["headers"]:
+            if name == b"idempotency-key":
+                idempotency_key = value.decode("latin-1").strip()
+                break
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_response(send, _error(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"), False)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.blake2b(body, digest_size=16).digest()
+        key = (scope["path"], idempotency_key)
+        store = self.store
+
+        while True:
+            response = store.get(key)
+            if response is None:
+                pending = store.pending.get(key)
+                if pending is None:
+                    response = await self._run(scope, receive, send, store, key, body, fingerprint)
+                    if response is None:
+                        return
+                else:
+                    response = await asyncio.shield(pending)
+                    if response is None:
+                        # The first request failed or was cancelled; run it ourselves
+                        continue
+            if response.fingerprint != fingerprint:
+                response = _error(422, "Idempotency-Key was already used with a different request body")
+                await _send_response(send, response, False)
+                return
+            store.replays += 1
+            await _send_response(send, response, True)
+            return
+
+    async def _run(self, scope, receive, send, store: IdempotencyStore, key, body: bytes, fingerprint: bytes) -> Optional[StoredResponse]:
+        """
+        Run the request under ``key``, or return the response another worker
+        stored under it for the caller to replay.
+        """
+        future = store.pending[key] = asyncio.get_running_loop().create_future()
+        start = None
+        sent_body = []
+        delivered = False
+
+        async def receive_body():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_recorded(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                sent_body.append(message.get("body", b""))
+            await send(message)
+
+        stored = None
+        try:
+            stored = await store.claim(key, fingerprint)
+            if stored is not None:
+                return stored
+            try:
+                await self.app(scope, receive_body, send_recorded)
+                if start is not None and 200 <= start["status"] < 300:
+                    response = StoredResponse(fingerprint, start["status"], list(start.get("headers", [])), b"".join(sent_body))
+                    await store.save(key, response)
+                    stored = response
+            finally:
+                if stored is None:
+                    await store.release(key)
+            return None
+        finally:
+            del store.pending[key]
+            future.set_result(stored)
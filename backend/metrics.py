@@ -0,0 +1,191 @@
+"""
+Request, event-loop and notification metrics in Prometheus text format.
+
+The middleware is plain ASGI and keeps one dict increment and one histogram
+observation per request, labelled by the matched route template rather
+than the raw path, so the label set stays small. The lag probe sleeps on
+the event loop and records how late it wakes up: anything blocking the
+loop (a synchronous HTTP call, hashing a password inline) shows up there.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; finer than Prometheus' defaults at the low end since most requests are served from memory
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        # One slot per bound plus the +Inf overflow; made cumulative when rendered
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsWriter:
+    """Accumulates metric families and renders the exposition text."""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def _family(self, name: str, kind: str, help: str) -> None:
+        self._lines.append(f"# HELP {name} {help}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, help: str, samples: Iterable[Tuple[Labels, float]]) -> None:
+        self._family(name, "counter", help)
+        self._lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in samples)
+
+    def gauge(self, name: str, help: str, samples: Iterable[Tuple[Labels, float]]) -> None:
+        self._family(name, "gauge", help)
+        self._lines.extend(f"{name}{_labels(labels)} {value}" for labels, value in samples)
+
+    def histogram(self, name: str, help: str, samples: Iterable[Tuple[Labels, Histogram]]) -> None:
+        self._family(name, "histogram", help)
+        lines = self._lines
+        for labels, histogram in samples:
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ("+Inf",), histogram.counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{name}_bucket{_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+class RequestMetrics:
+    def __init__(self):
+        # (method, route, status) -> requests
+        self.counts: Dict[Tuple[str, str, str], int] = {}
+        # (method, route) -> latency
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.in_progress = 0
+
+    def observe(self, method: str, route: str, status: int, elapsed: float) -> None:
+        key = (method, route, str(status))
+        self.counts[key] = self.counts.get(key, 0) + 1
+        histogram = self.latency.get((method, route))
+        if histogram is None:
+            histogram = self.latency[(method, route)] = Histogram()
+        histogram.observe(elapsed)
+
+    def write(self, writer: MetricsWriter) -> None:
+        writer.counter("http_requests_total", "HTTP requests by route template and status.", (
+            ((("method", method), ("route", route), ("status", status)), count)
+            for (method, route, status), count in sorted(self.counts.items())
+        ))
+        writer.histogram("http_request_duration_seconds", "HTTP request latency by route template.", (
+            ((("method", method), ("route", route)), histogram)
+            for (method, route), histogram in sorted(self.latency.items())
+        ))
+        writer.gauge("http_requests_in_progress", "HTTP requests being served.", [((), self.in_progress)])
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and records it under its route template."""
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+        self._routes: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        # The router stores the matched endpoint in the (shared) scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in scope["app"].router.routes:
+                if getattr(candidate, "endpoint", None) is endpoint:
+                    route = candidate.path
+                    break
+            else:
+                route = "unmatched"
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_progress += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_progress -= 1
+            metrics.observe(scope["method"], self._route(scope), status, time.perf_counter() - start)
+
+
+class LoopLagProbe:
+    """Measures how late the event loop runs a timer that should fire every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.lag = Histogram(LATENCY_BUCKETS)
+        self.last = 0.0
+        self.max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - start - self.interval, 0.0)
+            self.last = lag
+            if lag > self.max:
+                self.max = lag
+            self.lag.observe(lag)
+
+    def write(self, writer: MetricsWriter) -> None:
+        writer.histogram("event_loop_lag_seconds", "How late the event loop ran a periodic timer.", [((), self.lag)])
+        writer.gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample.", [((), self.last)])
+        writer.gauge("event_loop_lag_max_seconds", "Largest event loop lag seen.", [((), self.max)])
@@ -0,0 +1,285 @@
+"""
+In-process outbox for outbound notifications.
+
+Handlers enqueue a message and return immediately; background workers
+deliver it through a sender coroutine with bounded concurrency, retry
+failures with exponential backoff and park messages that keep failing in
+a dead-letter list.
+
+httpx is imported on first send rather than at startup: most processes
+never make an outbound request (no credentials configured, or no inquiry
+before the next scale-to-zero).
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Deque, Dict, NamedTuple, Optional
+
+from metrics import Histogram
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_API_URL = "https://graph.facebook.com/v22.0"
+WHATSAPP_TARGET_NUMBER = "918983692788"  # The number mentioned in the site/user request
+
+
+class InquiryAlert(NamedTuple):
+    """Anything with these fields can be sent through the inquiry alert template."""
+    name: str
+    phone: str
+    email: Optional[str]
+    course_interested: str
+    message: Optional[str]
+
+
+def digest_alert(count: int, course_counts: Dict[str, int]) -> InquiryAlert:
+    """One alert summarising a batch of inquiries instead of one alert each."""
+    top = sorted(course_counts.items(), key=lambda item: item[1], reverse=True)[:5]
+    return InquiryAlert(
+        name="Bulk import",
+        phone="N/A",
+        email=None,
+        course_interested=", ".join(f"{course} ({n})" for course, n in top) or "N/A",
+        message=f"{count} inquiries imported",
+    )
+
+
+class NotificationError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class NotificationOutbox:
+    def __init__(
+        self,
+        sender: Callable[[Any], Awaitable[None]],
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        dead_letter_size: int = 1000,
+    ):
+        self.sender = sender
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letters: Deque[dict] = deque(maxlen=dead_letter_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._retry_handles = set()
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+        self.latency_histogram = Histogram()
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self._queue
+
+    def enqueue(self, message: Any) -> None:
+        self.queue.put_nowait((message, 1))
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Give queued messages and pending retries ``timeout`` seconds to drain, then cancel the workers."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+        except asyncio.TimeoutError:
+            undelivered = self.queue.qsize() + self.in_flight + len(self._retry_handles)
+            logger.warning(f"Notification outbox stopped with {undelivered} message(s) undelivered")
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _drain(self) -> None:
+        while True:
+            await self.queue.join()
+            # A retry is scheduled before its failed attempt is marked done
+            if not self._retry_handles:
+                return
+            await asyncio.sleep(0.05)
+
+    async def _worker(self) -> None:
+        while True:
+            message, attempt = await self.queue.get()
+            try:
+                await self._deliver(message, attempt)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, message: Any, attempt: int) -> None:
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.sender(message)
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            if retryable and attempt < self.max_attempts:
+                self.retried += 1
+                self._schedule_retry(message, attempt + 1)
+                logger.warning(f"Notification attempt {attempt} failed, retrying: {str(e)}")
+            else:
+                self.failed += 1
+                self.dead_letters.append({"message": message, "attempts": attempt, "error": str(e)})
+                logger.error(f"Notification dead-lettered after {attempt} attempt(s): {str(e)}")
+        else:
+            self.sent += 1
+        finally:
+            self.in_flight -= 1
+            self._record_latency(time.perf_counter() - start)
+
+    def _schedule_retry(self, message: Any, attempt: int) -> None:
+        delay = min(self.base_delay * 2 ** (attempt - 2), self.max_delay)
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            self.queue.put_nowait((message, attempt))
+
+        handle = loop.call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    def _record_latency(self, elapsed: float) -> None:
+        self.latency_count += 1
+        self.latency_total += elapsed
+        self.latency_last = elapsed
+        if elapsed > self.latency_max:
+            self.latency_max = elapsed
+        self.latency_histogram.observe(elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "pending_retries": len(self._retry_handles),
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dead_letters": len(self.dead_letters),
+            "latency_ms": {
+                "last": round(self.latency_last * 1000, 3),
+                "avg": round(self.latency_total / self.latency_count * 1000, 3) if self.latency_count else 0.0,
+                "max": round(self.latency_max * 1000, 3),
+            },
+        }
+
+
+class WhatsAppSender:
+    """
+    Sends inquiry alerts through the WhatsApp Cloud API (Meta) over a pooled
+    async client, or logs them if credentials are not configured.
+
+    ``WHATSAPP_API_URL`` can point at a local stub server in tests.
+    """
+
+    def __init__(self):
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=os.environ.get("WHATSAPP_API_URL", WHATSAPP_API_URL),
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def __call__(self, inquiry) -> None:
+        whatsapp_token = os.environ.get("WHATSAPP_TOKEN")
+        whatsapp_phone_number_id = os.environ.get("WHATSAPP_PHONE_NUMBER_ID")
+
+        if not (whatsapp_token and whatsapp_phone_number_id):
+            # Simulation mode if credentials are missing
+            logger.info("ℹ️ WhatsApp credentials not found in .env. Simulating send:")
+            logger.info(f"📤 To: {WHATSAPP_TARGET_NUMBER}")
+            logger.info(f"📝 Content:\n{message_body(inquiry)}")
+            return
+
+        import httpx
+
+        headers = {
+            "Authorization": f"Bearer {whatsapp_token}",
+            "Content-Type": "application/json"
+        }
+        try:
+            response = await self.client.post(
+                f"/{whatsapp_phone_number_id}/messages", headers=headers, json=template_payload(inquiry)
+            )
+        except httpx.HTTPError as e:
+            raise NotificationError(f"WhatsApp request failed: {str(e)}")
+
+        if response.status_code == 200:
+            logger.info("✅ WhatsApp notification sent successfully")
+            return
+        # Rate limits and server errors are worth retrying, other client errors are not
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise NotificationError(f"❌ Failed to send WhatsApp notification: {response.text}", retryable=retryable)
+
+
+def message_body(inquiry) -> str:
+    return (
+        f"🔔 *New Inquiry Received*\n\n"
+        f"👤 *Name:* {inquiry.name}\n"
+        f"📞 *Phone:* {inquiry.phone}\n"
+        f"📧 *Email:* {inquiry.email or 'N/A'}\n"
+        f"📚 *Course:* {inquiry.course_interested}\n"
+        f"💬 *Message:* {inquiry.message or 'N/A'}\n"
+    )
+
+
+def template_payload(inquiry) -> dict:
+    return {
+        "messaging_product": "whatsapp",
+        "to": WHATSAPP_TARGET_NUMBER,
+        "type": "template",
+        "template": {
+            "name": "inquiry_alert",
+            "language": {
+                "code": "en_US"
+            },
+            "components": [
+                {
+                    "type": "body",
+                    "parameters": [
+                        {"type": "text", "text": inquiry.name},
+                        {"type": "text", "text": inquiry.phone or 'N/A'},
+                        {"type": "text", "text": inquiry.email or 'N/A'},
+                        {"type": "text", "text": inquiry.course_interested or 'N/A'},
+                        {"type": "text", "text": inquiry.message or 'N/A'}
+                    ]
+                }
+            ]
+        }
+    }
@@ -0,0 +1,329 @@
+"""
+Durable write-ahead log plus snapshots for the in-memory store.
+
+Every mutation announced by a ``Collection`` is appended to the current
+log segment as one JSON line. Appends are buffered and written by a
+background flusher, so all handlers waiting in ``commit()`` during the
+same window share one ``fsync`` (group commit). Every ``snapshot_every``
+entries the whole store is written to ``snapshot.json`` and older segments
+are deleted, so a cold start loads the snapshot and replays only the tail.
+
+A snapshot only copies the list of packed rows on the event loop. The
+log moves to a new segment at that point, and the rows are encoded and
+written on a thread of their own, so commits carry on while it runs.
+
+Layout of the data directory::
+
+    snapshot.json              {"seq": N, "collections": {name: packed rows or records}}
+    wal-<first seq>.log        entries with seq > the snapshot's
+"""
+import asyncio
+import gc
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import orjson
+
+import encoding
+from store import Collection
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+# Records encoded per orjson call when writing a snapshot; each call holds the GIL
+SNAPSHOT_CHUNK = 1000
+
+
+class Journal:
+    def __init__(
+        self,
+        directory: Optional[str],
+        commit_interval: float = 0.002,
+        snapshot_every: int = 50000,
+        retry_interval: float = 1.0,
+        datetime_fields=("created_at",),
+    ):
+        self.directory = Path(directory) if directory else None
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.retry_interval = retry_interval
+        self.datetime_fields = datetime_fields
+        self.seq = 0
+        self._since_snapshot = 0
+        self._collections: Dict[str, Collection] = {}
+        self._buffer: List[bytes] = []
+        self._waiters: List[asyncio.Future] = []
+        self._pending: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._snapshotter: Optional[asyncio.Task] = None
+        self._file = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._snapshot_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    # Startup
+
+    def load(self, db: Dict[str, Collection]) -> None:
+        """Rebuild ``db`` from the latest snapshot and the log tail, then start journaling its mutations."""
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._collections = db
+        # Loading allocates containers for every record, which would set off
+        # repeated cycle collections over the growing store for nothing
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            replayed = self._load(db)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self._since_snapshot = replayed
+
+        for name, collection in db.items():
+            collection.subscribe(self._listener(name))
+        logger.info(
+            f"Loaded store from {self.directory} in {(time.perf_counter() - started) * 1000:.1f} ms "
+            f"(seq {self.seq}, {replayed} log entries replayed)"
+        )
+
+    def _load(self, db: Dict[str, Collection]) -> int:
+        """Load the snapshot and replay the log tail into ``db``; returns the entries replayed."""
+        snapshot_path = self.directory / SNAPSHOT_FILE
+        if snapshot_path.exists():
+            with open(snapshot_path, "rb") as f:
+                snapshot = orjson.loads(f.read())
+            self.seq = snapshot["seq"]
+            for name, data in snapshot["collections"].items():
+                if isinstance(data, dict):
+                    db[name].load_rows(data["fields"], data["timestamps"], data["rows"])
+                else:
+                    db[name].insert_many(self._decode(record) for record in data)
+
+        replayed = 0
+        for first_seq, path in self._segments():
+            offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("missing newline")
+                        entry = orjson.loads(line)
+                    except ValueError:
+                        # Torn write from a crash; it was never acknowledged.
+                        # Cut it off so later appends start on a clean line.
+                        logger.warning(f"Dropping truncated entry at the end of {path.name}")
+                        os.truncate(path, offset)
+                        break
+                    offset += len(line)
+                    if entry["s"] <= self.seq:
+                        continue
+                    self._apply(entry)
+                    self.seq = entry["s"]
+                    replayed += 1
+        return replayed
+
+    def _apply(self, entry: dict) -> None:
+        collection = self._collections[entry["c"]]
+        op = entry["op"]
+        if op == "insert":
+            record = self._decode(entry["r"])
+            if record["id"] not in collection:
+                collection.insert(record)
+        elif op == "delete":
+            collection.delete(entry["id"])
+        elif op == "update":
+            collection.update(entry["id"], **entry["ch"])
+
+    def _decode(self, record: dict) -> dict:
+        for field in self.datetime_fields:
+            value = record.get(field)
+            if isinstance(value, str):
+                record[field] = datetime.fromisoformat(value)
+        return record
+
+    def _segments(self):
+        segments = []
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                first_seq = int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            segments.append((first_seq, path))
+        return sorted(segments)
+
+    def _segment_path(self, first_seq: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{first_seq:012d}{SEGMENT_SUFFIX}"
+
+    # Appending
+
+    def _listener(self, name: str):
+        def append(op: str, record: dict, changes: Optional[dict]) -> None:
+            self.seq += 1
+            entry = {"s": self.seq, "c": name, "op": op}
+            if op == "insert":
+                entry["r"] = record
+            else:
+                entry["id"] = record["id"]
+                if op == "update":
+                    entry["ch"] = changes
+            self._buffer.append(encoding.dumps(entry) + b"\n")
+            self._since_snapshot += 1
+            if self._pending is not None:
+                self._pending.set()
+        return append
+
+    async def commit(self) -> None:
+        """Wait until everything journaled so far is on disk."""
+        if self._flusher is None or not self._buffer:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._pending.set()
+        await waiter
+
+    async def start(self) -> None:
+        if not self.enabled or self._flusher is not None:
+            return
+        await self._run_io(self._open_segment, self.seq + 1)
+        self._pending = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        if self._snapshotter is not None:
+            await asyncio.gather(self._snapshotter, return_exceptions=True)
+            self._snapshotter = None
+        await self._flush()
+        if self._since_snapshot:
+            await self.snapshot()
+        await self._run_io(self._close_segment)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._pending.wait()
+            # Let concurrent writers join this group before paying for the fsync
+            await asyncio.sleep(self.commit_interval)
+            if not await self._flush():
+                # The entries were kept; try again once the disk has had a moment
+                await asyncio.sleep(self.retry_interval)
+                self._pending.set()
+                continue
+            if self._since_snapshot >= self.snapshot_every and (self._snapshotter is None or self._snapshotter.done()):
+                # In the background, so the next group commits don't wait for it
+                self._snapshotter = asyncio.create_task(self._background_snapshot())
+
+    async def _background_snapshot(self) -> None:
+        try:
+            await self.snapshot()
+        except Exception as e:
+            logger.error(f"Failed to write snapshot: {str(e)}")
+
+    async def _flush(self) -> bool:
+        """Write out the buffer; ``False`` if that failed and the entries are still queued."""
+        self._pending.clear()
+        buffer, waiters = self._buffer, self._waiters
+        self._buffer, self._waiters = [], []
+        try:
+            if buffer:
+                await self._run_io(self._write, b"".join(buffer))
+        except Exception as e:
+            logger.error(f"Failed to write journal, will retry: {str(e)}")
+            # The store already holds these mutations, so they must reach the log eventually
+            self._buffer[:0] = buffer
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return False
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        return True
+
+    async def snapshot(self) -> None:
+        """Write the whole store to disk and drop the log segments it covers."""
+        # Captured without yielding to the loop, so it is consistent with seq
+        seq = self.seq
+        collections = {name: (collection.layout, collection.rows()) for name, collection in self._collections.items()}
+        self._since_snapshot = 0
+        # Entries after seq go to the new segment, which the snapshot keeps.
+        # Entries up to seq still in the buffer may land there too; replay skips them.
+        await self._run_io(self._open_segment, seq + 1)
+        await asyncio.get_running_loop().run_in_executor(self._snapshot_io, self._write_snapshot, seq, collections)
+
+    def _run_io(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    # Blocking file operations, run on the journal thread except for _write_snapshot
+
+    def _open_segment(self, first_seq: int) -> None:
+        self._close_segment()
+        # Unbuffered, so a failed write leaves nothing behind to be flushed later
+        self._file = open(self._segment_path(first_seq), "ab", buffering=0)
+        self._fsync_directory()
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, data: bytes) -> None:
+        end = self._file.tell()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view):]
+            os.fsync(self._file.fileno())
+        except Exception:
+            # Don't leave a partial entry for the retry to append after
+            os.ftruncate(self._file.fileno(), end)
+            raise
+
+    def _write_snapshot(self, seq: int, collections: dict) -> None:
+        started = time.perf_counter()
+        tmp_path = self.directory / (SNAPSHOT_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(b'{"seq":%d,"collections":{' % seq)
+            for i, (name, (layout, rows)) in enumerate(collections.items()):
+                f.write(b"," * (i > 0) + encoding.dumps(name) + b":")
+                fields = getattr(layout, "fields", None)
+                if fields is not None:
+                    # Rows as the layout packs them, so loading skips re-packing
+                    header = {"fields": fields, "timestamps": layout.timestamps}
+                    f.write(encoding.dumps(header)[:-1] + b',"rows":')
+                f.write(b"[")
+                for start in range(0, len(rows), SNAPSHOT_CHUNK):
+                    chunk = encoding.dump_records(rows[start:start + SNAPSHOT_CHUNK])
+                    f.write(b"," * (start > 0) + chunk[1:-1])
+                f.write(b"]}" if fields is not None else b"]")
+            f.write(b"}}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.directory / SNAPSHOT_FILE)
+        self._fsync_directory()
+        for first_seq, path in self._segments():
+            if first_seq <= seq:
+                path.unlink()
+        logger.info(f"Wrote snapshot at seq {seq} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def _fsync_directory(self) -> None:
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
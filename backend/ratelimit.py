@@ -0,0 +1,83 @@
+"""
+Bounded in-memory rate limiting and duplicate detection.
+
+Both structures are ordered dicts with O(1) lookups. Expired duplicates
+are dropped from the front, and the least recently seen key is evicted
+once ``max_keys`` is reached, so memory stays bounded however many
+clients show up.
+"""
+import re
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+def normalize_phone(phone: str) -> str:
+    """Digits only, without the country code, so '+91 98xxx' and '98xxx' match."""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) > 10 else digits
+
+
+class TokenBucketLimiter:
+    """``limit`` requests per ``period`` seconds per key; a limit of 0 disables it."""
+
+    def __init__(self, limit: int, period: float, max_keys: int = 100000):
+        if limit < 0 or period <= 0:
+            raise ValueError(f"Invalid rate limit: {limit} per {period} s")
+        self.enabled = limit > 0
+        self.capacity = float(limit)
+        self.refill_rate = limit / period
+        self.max_keys = max_keys
+        # key -> (tokens left, last refill time)
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable) -> float:
+        """Take a token for ``key``. Returns 0 if allowed, else seconds until one is available."""
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.refill_rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.refill_rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class DuplicateDetector:
+    def __init__(self, window: float, max_keys: int = 100000):
+        self.window = window
+        self.max_keys = max_keys
+        # key -> (record id, first seen); insertion order is time order
+        self._seen: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Id of the record remembered for ``key`` within the window, if any."""
+        self._expire(time.monotonic())
+        entry = self._seen.get(key)
+        return entry[0] if entry is not None else None
+
+    def remember(self, key: Hashable, record_id: str) -> None:
+        self._seen.pop(key, None)
+        self._seen[key] = (record_id, time.monotonic())
+        if len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+
+    def _expire(self, now: float) -> None:
+        seen = self._seen
+        while seen:
+            key, (_, first_seen) = next(iter(seen.items()))
+            if now - first_seen < self.window:
+                break
+            del seen[key]
@@ -0,0 +1,70 @@
+"""
+Running review rating aggregates, overall and per course.
+
+Only approved reviews with a rating from 1 to 5 count (the API rejects
+others, but older records may hold them), so ``count`` always equals the
+sum of the histogram. The aggregates follow the storage backend's
+change events for the reviews and remember what each review contributed,
+so inserts, deletes and approval or rating changes are all O(1) and a
+stats request never scans the reviews.
+"""
+from typing import Dict, Optional, Tuple
+
+RATINGS = range(1, 6)
+
+
+class RatingTotals:
+    __slots__ = ("count", "total", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.histogram = [0] * len(RATINGS)
+
+    def add(self, rating: int, sign: int) -> None:
+        self.count += sign
+        self.total += rating * sign
+        self.histogram[rating - RATINGS.start] += sign
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": round(self.total / self.count, 2) if self.count else None,
+            "histogram": {str(rating): self.histogram[rating - RATINGS.start] for rating in RATINGS},
+        }
+
+
+class RatingStats:
+    def __init__(self):
+        self.overall = RatingTotals()
+        self.courses: Dict[str, RatingTotals] = {}
+        # review id -> (course, rating) it is currently counted under
+        self._counted: Dict[str, Tuple[str, int]] = {}
+
+    def watch(self, storage, name: str = "reviews") -> None:
+        storage.subscribe(name, lambda op, record, changes: self._apply(record, present=op != "delete"))
+
+    def _apply(self, record: dict, present: bool) -> None:
+        review_id = record["id"]
+        previous = self._counted.pop(review_id, None)
+        if previous is not None:
+            self._add(*previous, sign=-1)
+        if present and record.get("approved") and record.get("rating") in RATINGS:
+            counted = (record["course"], record["rating"])
+            self._counted[review_id] = counted
+            self._add(*counted, sign=1)
+
+    def _add(self, course: str, rating: int, sign: int) -> None:
+        self.overall.add(rating, sign)
+        totals = self.courses.get(course)
+        if totals is None:
+            totals = self.courses[course] = RatingTotals()
+        totals.add(rating, sign)
+        if not totals.count:
+            del self.courses[course]
+
+    def get(self, course: Optional[str] = None) -> dict:
+        if course is None:
+            return {"course": None, **self.overall.as_dict()}
+        return {"course": course, **self.courses.get(course, RatingTotals()).as_dict()}
@@ -0,0 +1,125 @@
+"""
+In-process inverted index for site search.
+
+Collections are registered with the fields to index and a weight for each.
+The index subscribes to the storage backend's change events, so creates,
+updates and deletes are applied incrementally and it never needs a
+rebuild. It keeps the latest version of each indexed record, so results
+can be filtered and returned without going back to storage. Every query token matches as a prefix; documents matching more of
+the query rank first, then by TF-IDF score.
+"""
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset({"a", "an", "and", "for", "in", "is", "of", "on", "or", "the", "to", "with"})
+# Prefix matches count for less than whole-word matches
+PREFIX_FACTOR = 0.5
+
+DocKey = Tuple[str, str]
+
+
+def tokenize(text) -> List[str]:
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(text)
+    return [token for token in TOKEN_RE.findall(str(text).lower()) if token not in STOPWORDS]
+
+
+class SearchIndex:
+    def __init__(self):
+        self._fields: Dict[str, Dict[str, float]] = {}
+        # term -> {doc key: weighted term frequency}
+        self._postings: Dict[str, Dict[DocKey, float]] = {}
+        # Sorted vocabulary for prefix lookups
+        self._terms: List[str] = []
+        self._docs: Dict[DocKey, Dict[str, float]] = {}
+        self._records: Dict[DocKey, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def watch(self, name: str, storage, fields: Dict[str, float]) -> None:
+        """Index ``fields`` (name -> weight) of the records in collection ``name`` as they change."""
+        self._fields[name] = fields
+
+        def on_change(op, record, changes):
+            if op == "delete":
+                self.remove(name, record["id"])
+            elif op == "insert" or any(field in fields for field in changes):
+                self.remove(name, record["id"])
+                self.add(name, record)
+            elif (name, record["id"]) in self._records:
+                self._records[(name, record["id"])] = record
+
+        storage.subscribe(name, on_change)
+
+    def record(self, key: DocKey) -> Optional[dict]:
+        return self._records.get(key)
+
+    def add(self, name: str, record: dict) -> None:
+        key = (name, record["id"])
+        weights: Dict[str, float] = {}
+        for field, weight in self._fields[name].items():
+            for token in tokenize(record.get(field)):
+                weights[token] = weights.get(token, 0.0) + weight
+        if not weights:
+            return
+        self._docs[key] = weights
+        self._records[key] = record
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._terms, term)
+            postings[key] = weight
+
+    def remove(self, name: str, record_id: str) -> None:
+        key = (name, record_id)
+        weights = self._docs.pop(key, None)
+        if weights is None:
+            return
+        del self._records[key]
+        for term in weights:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def _expand(self, token: str) -> Iterable[Tuple[str, float]]:
+        """Vocabulary terms starting with ``token``, with their match factor."""
+        terms = self._terms
+        i = bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token):
+            term = terms[i]
+            yield term, 1.0 if term == token else PREFIX_FACTOR
+            i += 1
+
+    def search(self, query: str, limit: int = 20, accept: Optional[Callable[[DocKey], bool]] = None) -> List[Tuple[DocKey, float]]:
+        """Return up to ``limit`` ``(doc key, score)`` pairs accepted by ``accept``, best first."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        total = len(self._docs) or 1
+        scores: Dict[DocKey, float] = {}
+        matched: Dict[DocKey, int] = {}
+        for token in tokens:
+            best: Dict[DocKey, float] = {}
+            for term, factor in self._expand(token):
+                postings = self._postings[term]
+                idf = math.log(1 + total / len(postings))
+                for key, weight in postings.items():
+                    score = factor * weight * idf
+                    if score > best.get(key, 0.0):
+                        best[key] = score
+            for key, score in best.items():
+                scores[key] = scores.get(key, 0.0) + score
+                matched[key] = matched.get(key, 0) + 1
+        candidates = scores if accept is None else [key for key in scores if accept(key)]
+        ranked = heapq.nlargest(limit, candidates, key=lambda key: (matched[key], scores[key]))
+        return [(key, round(scores[key], 4)) for key in ranked]
@@ -1,15 +1,38 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+# First, so the framework imports below are timed
+from startup_profile import profile as startup_profile
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, Header, WebSocket
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 import os
-import requests
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uuid
-from datetime import datetime, timezone
-import bcrypt
+import base64
+import csv
+import io
+import math
+from datetime import date, datetime, timezone
 from dotenv import load_dotenv
+startup_profile.mark("framework imports")
+from storage import SESSIONS, MemoryStorage, SQLiteStorage
+from cache import CachedResponse, ResponseCache, etag_matches, variant_etag
+from compression import MINIMUM_SIZE, CompressionMiddleware, accepted_encoding
+import encoding
+from search import SearchIndex
+from ratings import RatingStats
+from analytics import InquiryStats
+from events import EventHub
+from home import HomeFeed
+from idempotency import REPLAYED_HEADER, IdempotencyMiddleware, IdempotencyStore
+from ratelimit import DuplicateDetector, TokenBucketLimiter, normalize_phone
+from auth import SessionStore, hash_password, verify_password
+from notifications import NotificationOutbox, WhatsAppSender, digest_alert
+from bulk import RowTooLarge, csv_rows, import_rows, ndjson_rows
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, LoopLagProbe, MetricsMiddleware, MetricsWriter, RequestMetrics
+startup_profile.mark("app module imports")
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -17,15 +40,6 @@ load_dotenv(ROOT_DIR / '.env')
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
-# In-memory storage
-db = {
-    "courses": [],
-    "reviews": [],
-    "inquiries": [],
-    "notices": [],
-    "admins": []
-}
-
 class CourseBase(BaseModel):
     name: str
     stream: str
@@ -41,7 +55,7 @@ class Course(CourseBase):
 
 class ReviewBase(BaseModel):
     name: str
-    rating: int
+    rating: int = Field(ge=1, le=5)
     comment: str
     course: str
 
@@ -90,207 +104,702 @@ class AdminResponse(BaseModel):
     username: str
     token: str
 
+# Pagination for the newest-first list endpoints
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def record_layout(model, interned=()) -> dict:
+    """Collection options that store ``model`` records as compact tuples rather than dicts."""
+    fields = model.model_fields
+    return {
+        "fields": tuple(fields),
+        "interned": interned,
+        "timestamps": tuple(name for name, field in fields.items() if field.annotation is datetime),
+    }
+
+# Collections, the fields each one is indexed on and how the memory backend lays out their records
+COLLECTIONS = {
+    "courses": {"indexes": ("stream",), **record_layout(Course, interned=("stream", "type"))},
+    "reviews": {"indexes": ("approved", "course"), **record_layout(Review, interned=("course",))},
+    "inquiries": {"indexes": ("status", "course_interested"), **record_layout(Inquiry, interned=("status", "course_interested"))},
+    "notices": {"indexes": ("active",), **record_layout(Notice, interned=("priority",))},
+    "admins": {"indexes": ("username",), "order_by": None, **record_layout(AdminUser)}
+}
+
+# STORAGE_BACKEND=memory (default): in-memory store persisted to DATA_DIR by a
+# write-ahead log + snapshots (DATA_DIR="" disables it); single process only.
+# STORAGE_BACKEND=sqlite: SQLite in WAL mode at SQLITE_PATH, safe for uvicorn --workers N.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "memory")
+if STORAGE_BACKEND == "sqlite":
+    storage = SQLiteStorage(
+        COLLECTIONS,
+        os.environ.get("SQLITE_PATH", str(ROOT_DIR / "data" / "meghmehul.db")),
+        pool_size=int(os.environ.get("SQLITE_POOL_SIZE", "4")),
+    )
+else:
+    storage = MemoryStorage(COLLECTIONS, os.environ.get("DATA_DIR", str(ROOT_DIR / "data")))
+
+# Encoded (and compressed) bodies of the public list endpoints, dropped whenever their collection changes
+response_cache = ResponseCache()
+for name in ("courses", "reviews", "notices"):
+    response_cache.watch(name, storage)
+
+# Site search over courses, reviews and notices, kept current by storage change events
+search_index = SearchIndex()
+search_index.watch("courses", storage, {"name": 3.0, "stream": 2.0, "type": 2.0, "features": 1.5, "description": 1.0})
+search_index.watch("reviews", storage, {"course": 2.0, "comment": 1.0})
+search_index.watch("notices", storage, {"title": 3.0, "content": 1.0})
+
+# Running rating count/sum/histogram of approved reviews, overall and per course
+rating_stats = RatingStats()
+rating_stats.watch(storage, "reviews")
+
+# Daily inquiry counts; days are taken at INQUIRY_STATS_UTC_OFFSET minutes from UTC (330 for IST)
+inquiry_stats = InquiryStats(int(os.environ.get("INQUIRY_STATS_UTC_OFFSET", "0")))
+inquiry_stats.watch(storage, "inquiries")
+
+# Live change feed for the admin dashboard (GET /api/events)
+event_hub = EventHub()
+for name in ("inquiries", "reviews", "courses", "notices"):
+    event_hub.watch(name, storage)
+
+# Landing-page bundle (GET /api/home), rebuilt after changes to what it shows
+HOME_REVIEWS = int(os.environ.get("HOME_REVIEWS", "6"))
+HOME_NOTICES = int(os.environ.get("HOME_NOTICES", "10"))
+
+async def build_home() -> bytes:
+    courses = {}
+    for course in await storage.scan("courses"):
+        courses.setdefault(course["stream"], []).append(course)
+    notices, _ = await storage.page("notices", HOME_NOTICES, None, "active", True)
+    reviews, _ = await storage.page("reviews", HOME_REVIEWS, None, "approved", True)
+    return encoding.dumps({
+        "courses": courses,
+        "notices": notices,
+        "reviews": reviews,
+        "rating": rating_stats.get(),
+    })
+
+home_feed = HomeFeed(build_home, {"Cache-Control": "no-cache"})
+for name in ("courses", "reviews", "notices"):
+    home_feed.watch(name, storage)
+
+# Abuse protection for POST /inquiries: per-client and per-phone token buckets,
+# plus folding of repeated (phone, course) submissions into the first record.
+# A limit of 0 turns that limiter off.
+INQUIRY_LIMIT_PERIOD = float(os.environ.get("INQUIRY_LIMIT_PERIOD", "60"))
+inquiry_ip_limiter = TokenBucketLimiter(int(os.environ.get("INQUIRY_IP_LIMIT", "10")), INQUIRY_LIMIT_PERIOD)
+inquiry_phone_limiter = TokenBucketLimiter(int(os.environ.get("INQUIRY_PHONE_LIMIT", "3")), INQUIRY_LIMIT_PERIOD)
+inquiry_duplicates = DuplicateDetector(float(os.environ.get("INQUIRY_DUPLICATE_WINDOW", "600")))
+# Reverse proxies in front of the app that append to X-Forwarded-For: a count,
+# or "true" for one. Unset means the header is ignored, as clients can write it.
+_forwarded_for = os.environ.get("TRUST_FORWARDED_FOR", "").lower()
+TRUSTED_PROXY_HOPS = 1 if _forwarded_for in ("true", "yes") else int(_forwarded_for or "0")
+
+# Responses of the create endpoints by Idempotency-Key, so client retries don't create
+# duplicates; with SQLite they are shared through the database, whichever worker a retry reaches
+idempotency_store = IdempotencyStore(
+    ttl=float(os.environ.get("IDEMPOTENCY_TTL", "86400")),
+    max_keys=int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "10000")),
+    shared=storage,
+)
+IDEMPOTENT_PATHS = ("/api/courses", "/api/reviews", "/api/inquiries", "/api/notices")
+
+sessions = SessionStore()
+# Logouts on any worker revoke the token here too
+storage.subscribe(SESSIONS, lambda op, record, changes: sessions.revoke(record["id"]))
+
+whatsapp_sender = WhatsAppSender()
+notification_outbox = NotificationOutbox(whatsapp_sender)
+
+request_metrics = RequestMetrics()
+loop_lag = LoopLagProbe()
+# If set, GET /api/metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+startup_profile.mark("models and configuration")
+
+def encode_cursor(key) -> str:
+    created_at, record_id = key
+    raw = f"{created_at.isoformat()}|{record_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+def decode_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode('utf-8')
+        created_at, record_id = raw.split("|", 1)
+        created_at = datetime.fromisoformat(created_at)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if created_at.tzinfo is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return (created_at, record_id)
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Query datetimes without an offset are taken as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+async def page_body(
+    name: str,
+    limit: int,
+    cursor: Optional[str],
+    field: Optional[str] = None,
+    value=None,
+    where: Optional[dict] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Encode a page of collection ``name`` straight to JSON, returning ``(body, headers)``.
+
+    Records were validated when they were written, so this skips the
+    per-item ``response_model`` pass; the declared models still document
+    the response in OpenAPI. ``since`` and ``until`` bound ``created_at``
+    to ``[since, until)``.
+    """
+    before = decode_cursor(cursor) or ((until,) if until else None)
+    after = (since,) if since else None
+    items, next_key = await storage.page(name, limit, before, field, value, after, where)
+    headers = {NEXT_CURSOR_HEADER: encode_cursor(next_key)} if next_key is not None else {}
+    return encoding.dump_records(items), headers
+
+async def cached_response(request: Request, name: str, key, build) -> Response:
+    """
+    Serve the cached body for ``key``, awaiting ``build()`` for ``(body, headers)``
+    only when the collection changed since it was last encoded.
+    """
+    entry = response_cache.get(name, key)
+    if entry is None:
+        version = response_cache.versions.get(name)
+        body, headers = await build()
+        if response_cache.versions.get(name) != version:
+            # Changed while we were reading; serve this body but don't cache it
+            return Response(body, media_type="application/json", headers=headers)
+        entry = response_cache.put(name, key, body, {"Cache-Control": "no-cache", **headers})
+    return serve_cached(request, entry)
+
+def serve_cached(request: Request, entry: CachedResponse) -> Response:
+    """Answer from ``entry`` with a 304 or its body in the negotiated encoding."""
+    content_encoding = accepted_encoding(request.headers.get("accept-encoding")) if len(entry.body) >= MINIMUM_SIZE else None
+    headers = entry.headers
+    if content_encoding is not None:
+        headers = {**headers, "ETag": variant_etag(entry.etag, content_encoding), "Content-Encoding": content_encoding}
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, headers["ETag"]) or etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    body = entry.encode(content_encoding) if content_encoding is not None else entry.body
+    return Response(body, media_type="application/json", headers=headers)
+
+async def cached_page(request: Request, name: str, limit: int, cursor: Optional[str], field: Optional[str] = None, value=None) -> Response:
+    def build():
+        return page_body(name, limit, cursor, field, value)
+    return await cached_response(request, name, (field, value, limit, cursor), build)
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    scheme, _, token = (authorization or "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+async def admin_session(token: Optional[str]) -> Optional[dict]:
+    if not token:
+        return None
+    session = sessions.get(token)
+    if session is None:
+        # Possibly issued by another worker
+        shared = await storage.load_session(token)
+        if shared is not None:
+            sessions.put(token, *shared)
+            session = sessions.get(token)
+    return session
+
+async def require_admin(authorization: Optional[str] = Header(None)) -> dict:
+    """Dependency for admin-only routes: validates the bearer token from admin_login."""
+    session = await admin_session(bearer_token(authorization))
+    if session is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return session
+
+def bulk_rows(request: Request, format: Optional[str], list_fields=()):
+    content_type = request.headers.get("content-type", "")
+    if format == "csv" or (format is None and "csv" in content_type):
+        return csv_rows(request.stream(), list_fields)
+    return ndjson_rows(request.stream())
+
+async def bulk_import(request: Request, name: str, model, format: Optional[str], list_fields=(), on_batch=None) -> dict:
+    """
+    Stream an NDJSON or CSV body into collection ``name``, validating each row with
+    ``model`` and inserting in batches. Returns a per-row error report.
+    """
+    def build(row: dict) -> dict:
+        row.pop("id", None)
+        record = model.model_validate(row).model_dump()
+        # Spreadsheet exports often drop the offset
+        record["created_at"] = as_utc(record["created_at"])
+        return record
+
+    async def insert_batch(records: List[dict]) -> None:
+        await storage.insert_many(name, records)
+        if on_batch is not None:
+            on_batch(records)
+
+    try:
+        return await import_rows(bulk_rows(request, format, list_fields), build, insert_batch)
+    except RowTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
 @api_router.get("/")
 async def root():
     return {"message": "Meghmehul Engineering Classes API"}
 
+@api_router.get("/home")
+async def get_home(request: Request):
+    """Courses by stream, active notices, the latest approved reviews and the overall rating, in one response."""
+    return serve_cached(request, await home_feed.get())
+
 @api_router.post("/courses", response_model=Course)
-async def create_course(course: CourseBase):
+async def create_course(course: CourseBase, admin: dict = Depends(require_admin)):
     course_obj = Course(**course.model_dump())
-    db["courses"].append(course_obj.model_dump())
+    await storage.insert("courses", course_obj.model_dump())
     return course_obj
 
 @api_router.get("/courses", response_model=List[Course])
-async def get_courses(stream: Optional[str] = None):
-    courses = db["courses"]
-    if stream:
-        courses = [c for c in courses if c['stream'] == stream]
-    return courses
+async def get_courses(request: Request, stream: Optional[str] = None):
+    async def build():
+        if stream:
+            courses = await storage.scan("courses", "stream", stream)
+        else:
+            courses = await storage.scan("courses")
+        return encoding.dump_records(courses), {}
+    return await cached_response(request, "courses", stream, build)
+
+@api_router.post("/courses/bulk")
+async def bulk_create_courses(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    admin: dict = Depends(require_admin),
+):
+    return await bulk_import(request, "courses", Course, format, list_fields=("features",))
 
 @api_router.delete("/courses/{course_id}")
-async def delete_course(course_id: str):
-    initial_len = len(db["courses"])
-    db["courses"] = [c for c in db["courses"] if c['id'] != course_id]
-    if len(db["courses"]) == initial_len:
+async def delete_course(course_id: str, admin: dict = Depends(require_admin)):
+    if await storage.delete("courses", course_id) is None:
         raise HTTPException(status_code=404, detail="Course not found")
     return {"message": "Course deleted"}
 
 @api_router.post("/reviews", response_model=Review)
 async def create_review(review: ReviewBase):
     review_obj = Review(**review.model_dump())
-    db["reviews"].append(review_obj.model_dump())
+    await storage.insert("reviews", review_obj.model_dump())
     return review_obj
 
 @api_router.get("/reviews", response_model=List[Review])
-async def get_reviews(approved: Optional[bool] = True):
-    reviews = db["reviews"]
+async def get_reviews(
+    request: Request,
+    approved: Optional[bool] = True,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+):
+    # Newest first
     if approved is not None:
-        reviews = [r for r in reviews if r.get('approved') == approved]
-    # Sort by created_at desc
-    reviews.sort(key=lambda x: x['created_at'], reverse=True)
-    return reviews
+        return await cached_page(request, "reviews", limit, cursor, "approved", approved)
+    return await cached_page(request, "reviews", limit, cursor)
+
+def search_visible(key) -> bool:
+    name, record_id = key
+    record = search_index.record(key)
+    if record is None:
+        return False
+    if name == "reviews":
+        return record.get('approved', False)
+    if name == "notices":
+        return record.get('active', False)
+    return True
+
+@api_router.get("/search")
+async def search(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100)):
+    results = []
+    for (name, record_id), score in search_index.search(q, limit, accept=search_visible):
+        results.append({"type": name[:-1], "score": score, "item": search_index.record((name, record_id))})
+    return Response(encoding.dumps({"query": q, "results": results}), media_type="application/json")
+
+@api_router.get("/reviews/stats")
+async def get_review_stats(course: Optional[str] = None):
+    return rating_stats.get(course)
+
+@api_router.patch("/reviews/{review_id}")
+async def update_review_approval(review_id: str, approved: bool, admin: dict = Depends(require_admin)):
+    if await storage.update("reviews", review_id, approved=approved) is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    return {"message": "Review updated"}
+
+def client_ip(request: Request) -> str:
+    if TRUSTED_PROXY_HOPS:
+        # Each proxy appends the address it saw, so anything left of the
+        # entry written by the outermost trusted proxy came from the client
+        forwarded = [
+            address.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for address in header.split(",")
+        ]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
+def check_rate_limit(limiter: TokenBucketLimiter, key) -> None:
+    retry_after = limiter.acquire(key)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many inquiries, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
 
 @api_router.post("/inquiries", response_model=Inquiry)
-async def create_inquiry(inquiry: InquiryBase):
+async def create_inquiry(inquiry: InquiryBase, request: Request):
+    phone = normalize_phone(inquiry.phone)
+    check_rate_limit(inquiry_ip_limiter, client_ip(request))
+    check_rate_limit(inquiry_phone_limiter, phone)
+
+    # A repeat of a recent (phone, course) submission returns the original record
+    duplicate_key = (phone, inquiry.course_interested.strip().lower())
+    duplicate_id = inquiry_duplicates.get(duplicate_key)
+    if duplicate_id is not None:
+        existing = await storage.get("inquiries", duplicate_id)
+        if existing is not None:
+            return existing
+
     inquiry_obj = Inquiry(**inquiry.model_dump())
-    db["inquiries"].append(inquiry_obj.model_dump())
-    
-    # Send WhatsApp Notification (Server-side)
+    inquiry_duplicates.remember(duplicate_key, inquiry_obj.id)
     try:
-        send_whatsapp_notification(inquiry_obj)
-    except Exception as e:
-        logger.error(f"Failed to send WhatsApp notification: {str(e)}")
-        
+        await storage.insert("inquiries", inquiry_obj.model_dump())
+    except Exception:
+        # If only the journal write failed, the record is kept (and the write
+        # retried) and the client's retry gets it back from the duplicate
+        # check, so this is the one chance to send its alert
+        if await storage.get("inquiries", inquiry_obj.id) is not None:
+            notification_outbox.enqueue(inquiry_obj)
+        raise
+    
+    # Send WhatsApp Notification (Server-side) in the background
+    notification_outbox.enqueue(inquiry_obj)
+
     return inquiry_obj
 
-def send_whatsapp_notification(inquiry: Inquiry):
-    """
-    Sends a WhatsApp notification using the WhatsApp Cloud API (Meta) or logs if not configured.
-    """
-    whatsapp_token = os.environ.get("WHATSAPP_TOKEN")
-    whatsapp_phone_number_id = os.environ.get("WHATSAPP_PHONE_NUMBER_ID")
-    target_phone_number = "918983692788" # The number mentioned in the site/user request
-    
-    message_body = (
-        f"🔔 *New Inquiry Received*\n\n"
-        f"👤 *Name:* {inquiry.name}\n"
-        f"📞 *Phone:* {inquiry.phone}\n"
-        f"📧 *Email:* {inquiry.email or 'N/A'}\n"
-        f"📚 *Course:* {inquiry.course_interested}\n"
-        f"💬 *Message:* {inquiry.message or 'N/A'}\n"
-    )
+@api_router.post("/inquiries/bulk")
+async def bulk_create_inquiries(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    notify: Literal["none", "digest", "each"] = "digest",
+    admin: dict = Depends(require_admin),
+):
+    course_counts = {}
+
+    def on_batch(records: List[dict]) -> None:
+        for record in records:
+            if notify == "each":
+                notification_outbox.enqueue(Inquiry(**record))
+            course = record["course_interested"]
+            course_counts[course] = course_counts.get(course, 0) + 1
+
+    report = await bulk_import(request, "inquiries", Inquiry, format, on_batch=on_batch)
+    if notify == "digest" and report["inserted"]:
+        notification_outbox.enqueue(digest_alert(report["inserted"], course_counts))
+    return report
+
+@api_router.get("/notifications/stats")
+async def get_notification_stats(admin: dict = Depends(require_admin)):
+    return notification_outbox.stats()
+
+@api_router.get("/metrics")
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    writer = MetricsWriter()
+    request_metrics.write(writer)
+    loop_lag.write(writer)
+    writer.gauge("collection_records", "Records per collection.", [
+        ((("collection", name),), await storage.count(name)) for name in COLLECTIONS
+    ])
+    writer.gauge("event_subscribers", "Open live change feed connections.", [((), event_hub.subscribers)])
+    writer.counter("response_cache_hits_total", "List responses served from the cache.", [((), response_cache.hits)])
+    writer.counter("response_cache_misses_total", "List responses that had to be built.", [((), response_cache.misses)])
+    writer.counter("idempotent_replays_total", "Create requests answered from a stored Idempotency-Key response.", [((), idempotency_store.replays)])
+
+    outbox = notification_outbox
+    writer.counter("notifications_sent_total", "Notifications delivered.", [((), outbox.sent)])
+    writer.counter("notifications_failed_total", "Notifications dead-lettered.", [((), outbox.failed)])
+    writer.counter("notifications_retried_total", "Notification attempts scheduled for retry.", [((), outbox.retried)])
+    writer.gauge("notifications_queued", "Notifications waiting for a worker.", [((), outbox.queue.qsize())])
+    writer.gauge("notifications_in_flight", "Notifications being sent.", [((), outbox.in_flight)])
+    writer.histogram("notification_send_duration_seconds", "Time per notification delivery attempt.", [((), outbox.latency_histogram)])
+    return Response(writer.text(), media_type=METRICS_CONTENT_TYPE)
 
-    if whatsapp_token and whatsapp_phone_number_id:
-        url = f"https://graph.facebook.com/v22.0/{whatsapp_phone_number_id}/messages"
-        headers = {
-            "Authorization": f"Bearer {whatsapp_token}",
-            "Content-Type": "application/json"
-        }
-        data = {
-    "messaging_product": "whatsapp",
-    "to": "918983692788",
-    "type": "template",
-    "template": {
-        "name": "inquiry_alert",
-        "language": {
-            "code": "en_US"
-        },
-        "components": [
-            {
-                "type": "body",
-                "parameters": [
-                    {
-                        "type": "text",
-                        "text": inquiry.name
-                    },
-                    {
-                        "type": "text",
-                        "text": inquiry.phone or 'N/A'
-                    },
-                    {
-                        "type": "text",
-                        "text": inquiry.email or 'N/A'
-                    },
-                    {
-                        "type": "text",
-                        "text": inquiry.course_interested or 'N/A'
-                    },
-                    {
-                        "type": "text",
-                        "text": inquiry.message or 'N/A'
-                    }
-                ]
-            }
-        ]
+@api_router.get("/inquiries", response_model=List[Inquiry])
+async def get_inquiries(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[str] = None,
+    course_interested: Optional[str] = None,
+    admin: dict = Depends(require_admin),
+):
+    # Newest first, created in [since, until)
+    where = {
+        field: value
+        for field, value in (("status", status), ("course_interested", course_interested))
+        if value is not None
     }
-}
-
+    body, headers = await page_body("inquiries", limit, cursor, where=where, since=as_utc(since), until=as_utc(until))
+    return Response(body, media_type="application/json", headers=headers)
+
+@api_router.get("/inquiries/stats")
+async def get_inquiry_stats(
+    bucket: Literal["day", "week", "month"] = "day",
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    admin: dict = Depends(require_admin),
+):
+    # Days in [since, until)
+    return inquiry_stats.summary(bucket, since, until)
+
+EXPORT_CHUNK_ROWS = 500
+EXPORT_FIELDS = ["id", "created_at", "name", "phone", "email", "course_interested", "message", "status"]
+
+async def export_chunks(format: str, since: Optional[datetime], status: Optional[str]):
+    """
+    Yield encoded inquiries oldest first, EXPORT_CHUNK_ROWS at a time.
 
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200:
-            logger.info("✅ WhatsApp notification sent successfully")
+    Each chunk resumes after the last key sent instead of holding an
+    iterator, so concurrent writes between chunks can't break the walk.
+    """
+    field, value = ("status", status) if status else (None, None)
+    after = (since,) if since else None
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue().encode('utf-8')
+    while True:
+        rows = await storage.scan("inquiries", field, value, after, EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        after = storage.key("inquiries", rows[-1])
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([
+                    encoding.timestamp(row["created_at"]) if name == "created_at" else row.get(name) or ""
+                    for name in EXPORT_FIELDS
+                ])
+            yield buffer.getvalue().encode('utf-8')
         else:
-            logger.error(f"❌ Failed to send WhatsApp notification: {response.text}")
-    else:
-        # Simulation mode if credentials are missing
-        logger.info("ℹ️ WhatsApp credentials not found in .env. Simulating send:")
-        logger.info(f"📤 To: {target_phone_number}")
-        logger.info(f"📝 Content:\n{message_body}")
-
-@api_router.get("/inquiries", response_model=List[Inquiry])
-async def get_inquiries():
-    # Sort by created_at desc
-    inquiries = sorted(db["inquiries"], key=lambda x: x['created_at'], reverse=True)
-    return inquiries
+            yield b"".join(encoding.dumps(row) + b"\n" for row in rows)
+
+@api_router.get("/inquiries/export")
+async def export_inquiries(
+    format: Literal["csv", "ndjson"] = "csv",
+    since: Optional[datetime] = None,
+    status: Optional[str] = None,
+    admin: dict = Depends(require_admin),
+):
+    since = as_utc(since)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"inquiries.{format}"
+    return StreamingResponse(
+        export_chunks(format, since, status),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @api_router.patch("/inquiries/{inquiry_id}")
-async def update_inquiry_status(inquiry_id: str, status: str):
-    for inquiry in db["inquiries"]:
-        if inquiry['id'] == inquiry_id:
-            inquiry['status'] = status
-            return {"message": "Status updated"}
-    raise HTTPException(status_code=404, detail="Inquiry not found")
+async def update_inquiry_status(inquiry_id: str, status: str, admin: dict = Depends(require_admin)):
+    if await storage.update("inquiries", inquiry_id, status=status) is None:
+        raise HTTPException(status_code=404, detail="Inquiry not found")
+    return {"message": "Status updated"}
 
 @api_router.post("/notices", response_model=Notice)
-async def create_notice(notice: NoticeBase):
+async def create_notice(notice: NoticeBase, admin: dict = Depends(require_admin)):
     notice_obj = Notice(**notice.model_dump())
-    db["notices"].append(notice_obj.model_dump())
+    await storage.insert("notices", notice_obj.model_dump())
     return notice_obj
 
 @api_router.get("/notices", response_model=List[Notice])
-async def get_notices(active: Optional[bool] = True):
-    notices = db["notices"]
+async def get_notices(
+    request: Request,
+    active: Optional[bool] = True,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+):
     if active is not None:
-        notices = [n for n in notices if n.get('active') == active]
-    notices.sort(key=lambda x: x['created_at'], reverse=True)
-    return notices
+        return await cached_page(request, "notices", limit, cursor, "active", active)
+    return await cached_page(request, "notices", limit, cursor)
+
+@api_router.post("/notices/bulk")
+async def bulk_create_notices(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    admin: dict = Depends(require_admin),
+):
+    return await bulk_import(request, "notices", Notice, format)
 
 @api_router.delete("/notices/{notice_id}")
-async def delete_notice(notice_id: str):
-    initial_len = len(db["notices"])
-    db["notices"] = [n for n in db["notices"] if n['id'] != notice_id]
-    if len(db["notices"]) == initial_len:
+async def delete_notice(notice_id: str, admin: dict = Depends(require_admin)):
+    if await storage.delete("notices", notice_id) is None:
         raise HTTPException(status_code=404, detail="Notice not found")
     return {"message": "Notice deleted"}
 
+def event_collections(collections: Optional[str]):
+    return set(collections.split(",")) if collections else None
+
+@api_router.get("/events")
+async def stream_events(
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    collections: Optional[str] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events for changes to inquiries, reviews, courses and notices.
+
+    EventSource can't send headers, so the admin token may also be passed
+    as ``?token=``. Reconnects resume after ``Last-Event-ID``;
+    ``?collections=inquiries,reviews`` limits the feed.
+    """
+    if await admin_session(bearer_token(authorization) or token) is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    async def frames():
+        yield b"retry: 3000\n\n"
+        async for events in event_hub.follow(last_event_id_header or last_event_id, event_collections(collections)):
+            yield b"".join(event.frame for event in events) if events else b": ping\n\n"
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.websocket("/events")
+async def events_socket(
+    websocket: WebSocket,
+    token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    collections: Optional[str] = None,
+):
+    """The same feed over a WebSocket, one JSON message per event."""
+    if await admin_session(token) is None:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    async def send_events():
+        async for events in event_hub.follow(last_event_id, event_collections(collections)):
+            for event in events:
+                await websocket.send_text(event.data.decode('utf-8'))
+
+    sender = asyncio.create_task(send_events())
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
 @api_router.post("/admin/login", response_model=AdminResponse)
 async def admin_login(credentials: AdminLogin):
+    global admin_seed
+    if admin_seed is not None:
+        # A failed seed (storage briefly unavailable, say) is retried by the next login
+        if admin_seed.done() and not admin_seed.result():
+            admin_seed = asyncio.create_task(seed_default_admin())
+        await asyncio.shield(admin_seed)
     # Find admin
-    admin = next((a for a in db["admins"] if a['username'] == credentials.username), None)
+    admin = await storage.find_one("admins", "username", credentials.username)
     
-    if not admin:
-        # Default admin check (create if doesn't exist equivalent in logic)
-        if credentials.username == "admin" and credentials.password == "admin123":
-            # Check if default admin already in db to avoid duplicates if called multiple times (though simple list append is fine for now)
-            # Actually, let's just create a new one every time for this simple in-memory logic or check if exists
-            
-            # Encrypt password
-            password_hash = bcrypt.hashpw(credentials.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            admin_obj = AdminUser(username=credentials.username, password_hash=password_hash)
-            db["admins"].append(admin_obj.model_dump())
-            
-            token = str(uuid.uuid4())
-            return AdminResponse(id=admin_obj.id, username=admin_obj.username, token=token)
+    if not admin or not await verify_password(credentials.password, admin['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(credentials.password.encode('utf-8'), admin['password_hash'].encode('utf-8')):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    token = str(uuid.uuid4())
+    token, expires_at = sessions.issue(admin['id'], admin['username'])
+    await storage.save_session(token, admin['id'], admin['username'], expires_at)
     return AdminResponse(id=admin['id'], username=admin['username'], token=token)
 
+@api_router.post("/admin/logout")
+async def admin_logout(authorization: Optional[str] = Header(None), admin: dict = Depends(require_admin)):
+    token = authorization.partition(" ")[2]
+    sessions.revoke(token)
+    await storage.delete_session(token)
+    return {"message": "Logged out"}
+
+async def seed_default_admin() -> bool:
+    """Create the default admin if missing; False if that failed."""
+    username = os.environ.get("ADMIN_USERNAME", "admin")
+    try:
+        if await storage.find_one("admins", "username", username) is None:
+            password_hash = await hash_password(os.environ.get("ADMIN_PASSWORD", "admin123"))
+            # A fixed id lets concurrently starting workers race safely
+            admin_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"admin:{username}"))
+            admin_obj = AdminUser(id=admin_id, username=username, password_hash=password_hash)
+            try:
+                await storage.insert("admins", admin_obj.model_dump())
+            except KeyError:
+                pass
+    except Exception as e:
+        logger.error(f"Failed to seed default admin: {str(e)}")
+        return False
+    return True
+
+# Seeding hashes a password with bcrypt (~0.25 s), so it runs in the background
+# and only admin_login waits for it
+admin_seed: Optional[asyncio.Task] = None
+
 app.include_router(api_router)
 
+@app.on_event("startup")
+async def start_background_workers():
+    global admin_seed
+    startup_profile.mark("server setup")
+    await storage.start()
+    startup_profile.mark("storage load")
+    event_hub.start()
+    await home_feed.start()
+    admin_seed = asyncio.create_task(seed_default_admin())
+    await notification_outbox.start()
+    await loop_lag.start()
+    startup_profile.mark("startup hooks")
+    startup_profile.report()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    if admin_seed is not None:
+        await asyncio.gather(admin_seed, return_exceptions=True)
+    await loop_lag.stop()
+    await notification_outbox.stop()
+    await whatsapp_sender.aclose()
+    await storage.stop()
+
+# Inside CORS so replayed responses get the CORS headers too
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store, paths=IDEMPOTENT_PATHS)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REPLAYED_HEADER],
 )
+# gzip/Brotli for JSON bodies of MINIMUM_SIZE bytes and up; the cached list endpoints bring their own
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+startup_profile.mark("routes and middleware")
@@ -0,0 +1,52 @@
+"""
+Where the server's start-up time goes.
+
+``server`` imports this module first and marks the end of each start-up
+phase, which costs one ``perf_counter()`` call per phase. With
+``STARTUP_PROFILE=1`` the breakdown is logged once the startup hooks have
+run. ``benchmarks/startup.py`` breaks the import phases down per package.
+"""
+import logging
+import os
+import time
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Only needed on rarely used paths (outbound WhatsApp sends, admin password
+# checks), so they must not be imported at start-up
+DEFERRED = ("httpx", "bcrypt")
+
+# For ``python -c`` in a fresh interpreter with backend/ as the working
+# directory: prints how long ``import server`` took and which DEFERRED modules
+# it loaded. Used by benchmarks/startup.py and tests/test_startup.py.
+IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import server
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "deferred_loaded": [m for m in {DEFERRED!r} if m in sys.modules]}}))
+"""
+
+
+class StartupProfile:
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """Close ``phase``, timed from the previous mark."""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self) -> None:
+        if os.environ.get("STARTUP_PROFILE", "").lower() not in ("1", "true", "yes"):
+            return
+        total = sum(seconds for _, seconds in self.phases)
+        for phase, seconds in self.phases:
+            logger.info(f"Startup {phase}: {seconds * 1000:.1f} ms ({seconds / total:.0%})")
+        logger.info(f"Startup total: {total * 1000:.1f} ms")
+
+
+profile = StartupProfile()
@@ -0,0 +1,515 @@
+"""
+Storage backends the API handlers go through.
+
+``MemoryStorage`` keeps each collection in an indexed in-memory
+``Collection`` made durable by the ``Journal``; it is the fastest option
+but only works with a single process. ``SQLiteStorage`` keeps the data in
+one SQLite database in WAL mode, so several uvicorn workers share one
+consistent store while each reads through its own connections.
+
+Both backends announce mutations to listeners registered with
+``subscribe()`` as ``(op, record, changes)``, which is how the in-process
+views (response cache, search index, rating stats) stay current. With
+SQLite every write also appends to a ``changes`` table that each worker
+tails, so those views follow writes made by the other workers too.
+Records a backend already holds at startup are announced as inserts from
+``start()``.
+
+Revoked admin sessions are announced the same way, as ``("delete",
+{"id": token}, None)`` under the name ``SESSIONS``, so every worker drops
+a logged-out token from its session cache. SQLite also shares
+``Idempotency-Key`` claims and responses between workers, so a retry
+landing on another worker is still answered once.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+import encoding
+from persistence import Journal
+from store import Collection, Listener, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+SESSIONS = "sessions"
+
+class MemoryStorage:
+    def __init__(self, collections: Dict[str, dict], data_dir: Optional[str]):
+        self.collections = {name: Collection(**options) for name, options in collections.items()}
+        self.journal = Journal(data_dir)
+        self._session_listeners: List[Listener] = []
+
+    def subscribe(self, name: str, listener: Listener) -> None:
+        if name == SESSIONS:
+            self._session_listeners.append(listener)
+        else:
+            self.collections[name].subscribe(listener)
+
+    async def start(self) -> None:
+        self.journal.load(self.collections)
+        await self.journal.start()
+
+    async def stop(self) -> None:
+        await self.journal.stop()
+
+    def key(self, name: str, record: dict) -> Tuple:
+        return self.collections[name].key(record)
+
+    async def count(self, name: str) -> int:
+        return len(self.collections[name])
+
+    async def get(self, name: str, record_id: str) -> Optional[dict]:
+        return self.collections[name].get(record_id)
+
+    async def find_one(self, name: str, field: str, value: Any) -> Optional[dict]:
+        return self.collections[name].find_one(field, value)
+
+    async def page(
+        self,
+        name: str,
+        limit: int,
+        before: Optional[Tuple] = None,
+        field: Optional[str] = None,
+        value: Any = None,
+        after: Optional[Tuple] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ):
+        return self.collections[name].page(limit, before, field, value, after, where)
+
+    async def scan(self, name: str, field: Optional[str] = None, value: Any = None, after: Optional[Tuple] = None, limit: Optional[int] = None) -> List[dict]:
+        return list(islice(self.collections[name].oldest(field, value, after), limit))
+
+    async def insert(self, name: str, record: dict) -> dict:
+        self.collections[name].insert(record)
+        await self.journal.commit()
+        return record
+
+    async def insert_many(self, name: str, records: List[dict]) -> List[dict]:
+        self.collections[name].insert_many(records)
+        await self.journal.commit()
+        return records
+
+    async def update(self, name: str, record_id: str, **changes) -> Optional[dict]:
+        record = self.collections[name].update(record_id, **changes)
+        if record is not None:
+            await self.journal.commit()
+        return record
+
+    async def delete(self, name: str, record_id: str) -> Optional[dict]:
+        record = self.collections[name].delete(record_id)
+        if record is not None:
+            await self.journal.commit()
+        return record
+
+    # Sessions only need sharing between processes, which this backend doesn't support
+
+    async def save_session(self, token: str, admin_id: str, username: str, expires_at: float) -> None:
+        pass
+
+    async def load_session(self, token: str) -> Optional[tuple]:
+        return None
+
+    async def delete_session(self, token: str) -> None:
+        for listener in self._session_listeners:
+            listener("delete", {"id": token}, None)
+
+    # Idempotency keys likewise; the in-process IdempotencyStore covers them
+
+    async def claim_idempotency_key(self, path: str, key: str, fingerprint: bytes, expires_at: float) -> Optional[tuple]:
+        return None
+
+    async def save_idempotent_response(self, path: str, key: str, fingerprint: bytes, status: int, headers: bytes, body: bytes, expires_at: float) -> None:
+        pass
+
+    async def release_idempotency_key(self, path: str, key: str) -> None:
+        pass
+
+
+def _timestamp(value: Optional[datetime]) -> int:
+    """Microseconds since the epoch, the sort column for ``created_at``."""
+    return 0 if value is None else to_timestamp(value)
+
+
+class SQLiteStorage:
+    def __init__(self, collections: Dict[str, dict], path: str, pool_size: int = 4, poll_interval: float = 0.1, retain_changes: int = 100000):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retain_changes = retain_changes
+        self.collections = {name: dict(options) for name, options in collections.items()}
+        self._listeners: Dict[str, List[Listener]] = {name: [] for name in (*collections, SESSIONS)}
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="sqlite")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._last_seq = 0
+        self._writes = 0
+        self._catch_up_lock: Optional[asyncio.Lock] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    def subscribe(self, name: str, listener: Listener) -> None:
+        self._listeners[name].append(listener)
+
+    # Connections, one per pool thread
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, fn, *args):
+        def call():
+            return fn(self._connection(), *args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+
+    # Schema
+
+    def _order_by(self, name: str) -> Optional[str]:
+        return self.collections[name].get("order_by", "created_at")
+
+    def _indexes(self, name: str) -> Tuple[str, ...]:
+        return tuple(self.collections[name].get("indexes", ()))
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        for name in self.collections:
+            columns = "".join(f", {field}" for field in self._indexes(name))
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (id TEXT PRIMARY KEY, ts INTEGER NOT NULL{columns}, data TEXT NOT NULL)")
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}
+            for field in self._indexes(name):
+                if field not in existing:
+                    # Indexed since the table was created: add the column and fill it in
+                    conn.execute(f"ALTER TABLE {name} ADD COLUMN {field}")
+                    conn.execute(f"UPDATE {name} SET {field} = json_extract(data, '$.{field}')")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_ts ON {name} (ts, id)")
+            for field in self._indexes(name):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{field} ON {name} ({field}, ts, id)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, op TEXT NOT NULL, "
+            "data TEXT NOT NULL, changes TEXT)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, admin_id TEXT, username TEXT, expires_at REAL)")
+        # status is NULL while the claiming worker is still running the request
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            "path TEXT NOT NULL, key TEXT NOT NULL, fingerprint BLOB NOT NULL, status INTEGER, "
+            "headers BLOB, body BLOB, expires_at REAL NOT NULL, PRIMARY KEY (path, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at)")
+
+    # Records
+
+    def _decode(self, data) -> dict:
+        record = orjson.loads(data)
+        value = record.get("created_at")
+        if isinstance(value, str):
+            record["created_at"] = datetime.fromisoformat(value)
+        return record
+
+    def _row(self, name: str, record: dict) -> tuple:
+        order_by = self._order_by(name)
+        ts = _timestamp(record.get(order_by)) if order_by else 0
+        return (record["id"], ts, *(record.get(field) for field in self._indexes(name)), encoding.dumps(record))
+
+    def key(self, name: str, record: dict) -> Tuple:
+        order_by = self._order_by(name)
+        if order_by is None:
+            return (record["id"],)
+        return (record[order_by], record["id"])
+
+    def _where(self, name: str, filters: Dict[str, Any], after: Optional[Tuple] = None, before: Optional[Tuple] = None):
+        """SQL conditions for equality filters on indexed fields and bounds on ``(ts, id)``."""
+        clauses, params = [], []
+        for field, value in filters.items():
+            if field not in self._indexes(name):
+                raise KeyError(f"No index on field: {field}")
+            clauses.append(f"{field} = ?")
+            params.append(value)
+        for bound, op in ((after, ">"), (before, "<")):
+            if bound is None:
+                continue
+            if len(bound) == 1:
+                # (t,) sorts before every key at time t
+                clauses.append(f"ts {'>=' if op == '>' else '<'} ?")
+                params.append(_timestamp(bound[0]))
+            else:
+                clauses.append(f"(ts, id) {op} (?, ?)")
+                params.extend((_timestamp(bound[0]), bound[1]))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    async def count(self, name: str) -> int:
+        def query(conn):
+            return conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        return await self._run(query)
+
+    async def get(self, name: str, record_id: str) -> Optional[dict]:
+        def query(conn):
+            return conn.execute(f"SELECT data FROM {name} WHERE id = ?", (record_id,)).fetchone()
+        row = await self._run(query)
+        return self._decode(row[0]) if row else None
+
+    async def find_one(self, name: str, field: str, value: Any) -> Optional[dict]:
+        items, _ = await self.page(name, 1, None, field, value)
+        return items[0] if items else None
+
+    async def page(
+        self,
+        name: str,
+        limit: int,
+        before: Optional[Tuple] = None,
+        field: Optional[str] = None,
+        value: Any = None,
+        after: Optional[Tuple] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ):
+        filters = dict(where or {})
+        if field is not None:
+            filters[field] = value
+        where, params = self._where(name, filters, after, before)
+
+        def query(conn):
+            sql = f"SELECT data FROM {name}{where} ORDER BY ts DESC, id DESC LIMIT ?"
+            return conn.execute(sql, (*params, limit + 1)).fetchall()
+        items = [self._decode(row[0]) for row in await self._run(query)]
+        if len(items) <= limit:
+            return items, None
+        items.pop()
+        return items, self.key(name, items[-1])
+
+    async def scan(self, name: str, field: Optional[str] = None, value: Any = None, after: Optional[Tuple] = None, limit: Optional[int] = None) -> List[dict]:
+        where, params = self._where(name, {field: value} if field is not None else {}, after)
+
+        def query(conn):
+            sql = f"SELECT data FROM {name}{where} ORDER BY ts, id LIMIT ?"
+            return conn.execute(sql, (*params, -1 if limit is None else limit)).fetchall()
+        return [self._decode(row[0]) for row in await self._run(query)]
+
+    # Writes: each runs in one transaction together with its change-log entry
+
+    def _write(self, conn: sqlite3.Connection, fn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _log(self, conn: sqlite3.Connection, name: str, op: str, record: dict, changes: Optional[dict] = None) -> None:
+        conn.execute(
+            "INSERT INTO changes (collection, op, data, changes) VALUES (?, ?, ?, ?)",
+            (name, op, encoding.dumps(record), encoding.dumps(changes) if changes is not None else None),
+        )
+
+    async def insert(self, name: str, record: dict) -> dict:
+        await self.insert_many(name, [record])
+        return record
+
+    async def insert_many(self, name: str, records: List[dict]) -> List[dict]:
+        placeholders = ", ".join("?" * (3 + len(self._indexes(name))))
+
+        def write(conn):
+            try:
+                conn.executemany(f"INSERT INTO {name} VALUES ({placeholders})", [self._row(name, r) for r in records])
+            except sqlite3.IntegrityError as e:
+                raise KeyError(f"Duplicate id in {name}: {str(e)}")
+            for record in records:
+                self._log(conn, name, "insert", record)
+        await self._run(self._write, write)
+        await self._after_write(len(records))
+        return records
+
+    async def update(self, name: str, record_id: str, **changes) -> Optional[dict]:
+        if self._order_by(name) in changes or "id" in changes:
+            raise ValueError("Ordering fields cannot be updated")
+
+        def write(conn):
+            row = conn.execute(f"SELECT data FROM {name} WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                return None
+            record = self._decode(row[0])
+            record.update(changes)
+            columns = [field for field in self._indexes(name) if field in changes]
+            assignments = "".join(f", {field} = ?" for field in columns)
+            conn.execute(
+                f"UPDATE {name} SET data = ?{assignments} WHERE id = ?",
+                (encoding.dumps(record), *(changes[field] for field in columns), record_id),
+            )
+            self._log(conn, name, "update", record, changes)
+            return record
+        record = await self._run(self._write, write)
+        if record is not None:
+            await self._after_write(1)
+        return record
+
+    async def delete(self, name: str, record_id: str) -> Optional[dict]:
+        def write(conn):
+            row = conn.execute(f"SELECT data FROM {name} WHERE id = ?", (record_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"DELETE FROM {name} WHERE id = ?", (record_id,))
+            record = self._decode(row[0])
+            self._log(conn, name, "delete", record)
+            return record
+        record = await self._run(self._write, write)
+        if record is not None:
+            await self._after_write(1)
+        return record
+
+    async def _after_write(self, count: int) -> None:
+        # Apply our own write to the local views before answering the request
+        await self._catch_up()
+        self._writes += count
+        if self._writes >= 1000:
+            self._writes = 0
+            await self._run(self._trim_changes)
+
+    def _trim_changes(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (self.retain_changes,))
+
+    # Change log tailing
+
+    def _notify(self, name: str, op: str, record: dict, changes: Optional[dict]) -> None:
+        for listener in self._listeners[name]:
+            listener(op, record, changes)
+
+    async def _catch_up(self) -> None:
+        if self._catch_up_lock is None:
+            return
+        async with self._catch_up_lock:
+            while True:
+                last_seq = self._last_seq
+
+                def query(conn):
+                    return conn.execute(
+                        "SELECT seq, collection, op, data, changes FROM changes WHERE seq > ? ORDER BY seq LIMIT 1000",
+                        (last_seq,),
+                    ).fetchall()
+                rows = await self._run(query)
+                if rows and rows[0][0] > last_seq + 1 and last_seq:
+                    logger.warning(f"Change log was trimmed past seq {last_seq}; local views may miss updates")
+                for seq, name, op, data, changes in rows:
+                    self._last_seq = seq
+                    if self._listeners.get(name):
+                        self._notify(name, op, self._decode(data), orjson.loads(changes) if changes else None)
+                if len(rows) < 1000:
+                    return
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._catch_up()
+            except Exception as e:
+                logger.error(f"Failed to read change log: {str(e)}")
+
+    def _bootstrap(self, conn: sqlite3.Connection):
+        """Read the change-log position and the watched collections in one snapshot."""
+        conn.execute("BEGIN")
+        try:
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+            rows = {
+                name: conn.execute(f"SELECT data FROM {name} ORDER BY ts, id").fetchall()
+                for name in self.collections if self._listeners[name]
+            }
+        finally:
+            conn.execute("COMMIT")
+        return last_seq, rows
+
+    async def start(self) -> None:
+        if self._poller is not None:
+            return
+        started = time.perf_counter()
+        # In a write transaction so workers starting together don't both migrate
+        await self._run(self._write, self._create_schema)
+        self._last_seq, rows = await self._run(self._bootstrap)
+        for name, records in rows.items():
+            for (data,) in records:
+                self._notify(name, "insert", self._decode(data), None)
+        self._catch_up_lock = asyncio.Lock()
+        self._poller = asyncio.create_task(self._poll())
+        logger.info(f"Opened SQLite store {self.path} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    async def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._pool.shutdown(wait=True)
+
+    # Sessions, shared so a token issued by one worker is valid on all of them
+
+    async def save_session(self, token: str, admin_id: str, username: str, expires_at: float) -> None:
+        def write(conn):
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+            conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)", (token, admin_id, username, expires_at))
+        await self._run(self._write, write)
+
+    async def load_session(self, token: str) -> Optional[tuple]:
+        def query(conn):
+            return conn.execute(
+                "SELECT admin_id, username, expires_at FROM sessions WHERE token = ? AND expires_at > ?",
+                (token, time.time()),
+            ).fetchone()
+        return await self._run(query)
+
+    async def delete_session(self, token: str) -> None:
+        def write(conn):
+            conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+            # Other workers may have the token cached; they see this when tailing the log
+            self._log(conn, SESSIONS, "delete", {"id": token})
+        await self._run(self._write, write)
+        await self._after_write(1)
+
+    # Idempotency keys, shared so a retry landing on another worker doesn't run again
+
+    async def claim_idempotency_key(self, path: str, key: str, fingerprint: bytes, expires_at: float) -> Optional[tuple]:
+        """
+        Claim ``key`` until ``expires_at``. Returns None if this worker now
+        holds it, else the holder's ``(fingerprint, status, headers, body)``
+        with ``status`` None while its request is still running.
+        """
+        def write(conn):
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (time.time(),))
+            row = conn.execute(
+                "SELECT fingerprint, status, headers, body FROM idempotency_keys WHERE path = ? AND key = ?", (path, key)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO idempotency_keys VALUES (?, ?, ?, NULL, NULL, NULL, ?)", (path, key, fingerprint, expires_at)
+                )
+            return row
+        return await self._run(self._write, write)
+
+    async def save_idempotent_response(self, path: str, key: str, fingerprint: bytes, status: int, headers: bytes, body: bytes, expires_at: float) -> None:
+        def write(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, key, fingerprint, status, headers, body, expires_at),
+            )
+        await self._run(self._write, write)
+
+    async def release_idempotency_key(self, path: str, key: str) -> None:
+        """Drop an unfinished claim, so the next request with ``key`` runs."""
+        def write(conn):
+            conn.execute("DELETE FROM idempotency_keys WHERE path = ? AND key = ? AND status IS NULL", (path, key))
+        await self._run(self._write, write)
@@ -0,0 +1,438 @@
+"""
+In-memory record store behind ``storage.MemoryStorage``.
+
+Each collection keeps its records keyed by id and maintains secondary
+indexes on the fields the handlers filter by, so point lookups, deletes
+and filtered reads never scan the whole collection. Records are also kept
+ordered by ``created_at`` as they are inserted, so newest-first reads
+never sort.
+
+Collections given their ``fields`` store each record as a tuple laid out
+by a ``RecordLayout`` rather than as a dict, which drops the per-record
+dict and its repeated keys. Timestamps are kept as integer microseconds
+and enum-like values are interned. Reads hand back plain dicts, so
+callers never see the packed rows.
+
+Mutations are announced to subscribed listeners as ``(op, record,
+changes)`` with ``op`` one of ``"insert"``, ``"update"`` or ``"delete"``.
+"""
+import sys
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Listener = Callable[[str, dict, Optional[dict]], None]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_timestamp(value: Optional[datetime]) -> Optional[int]:
+    """Microseconds since the epoch."""
+    if value is None:
+        return None
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_timestamp(value: Optional[int]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return EPOCH + timedelta(0, 0, value)
+
+
+class DictLayout:
+    """Stores each record as its own dict (a copy, so callers can't change it in place)."""
+
+    timestamps = ()
+
+    def pack(self, record: dict) -> dict:
+        return dict(record)
+
+    def unpack(self, row: dict) -> dict:
+        return dict(row)
+
+    def value(self, field: str) -> Callable[[dict], Any]:
+        return lambda row: row.get(field)
+
+    def values(self, *fields: str) -> Callable[[dict], Tuple]:
+        return lambda row: tuple(row.get(field) for field in fields)
+
+    def replace(self, row: dict, changes: dict) -> dict:
+        return {**row, **changes}
+
+
+class RecordLayout:
+    """
+    Stores records as tuples in ``fields`` order. Fields in ``timestamps``
+    hold integer microseconds since the epoch and string values of
+    ``interned`` fields are interned, so every record with status "new"
+    shares one string. Fields a record lacks are stored as ``None``;
+    fields outside the layout are dropped.
+    """
+
+    def __init__(self, fields: Iterable[str], interned: Iterable[str] = (), timestamps: Iterable[str] = ()):
+        self.fields = tuple(fields)
+        self.positions = {field: i for i, field in enumerate(self.fields)}
+        self.timestamps = tuple(timestamps)
+        self._interned = tuple(self.positions[field] for field in interned)
+        self._timestamps = tuple(self.positions[field] for field in self.timestamps)
+
+    def pack(self, record: dict) -> tuple:
+        values = [record.get(field) for field in self.fields]
+        for i in self._interned:
+            if type(values[i]) is str:
+                values[i] = sys.intern(values[i])
+        for i in self._timestamps:
+            values[i] = to_timestamp(values[i])
+        return tuple(values)
+
+    def repack(self, values: list) -> tuple:
+        """A row from an earlier ``pack()`` that went through JSON, so only re-interned."""
+        for i in self._interned:
+            if type(values[i]) is str:
+                values[i] = sys.intern(values[i])
+        return tuple(values)
+
+    def unpack(self, row: tuple) -> dict:
+        record = dict(zip(self.fields, row))
+        for field in self.timestamps:
+            value = record[field]
+            if value is not None:
+                record[field] = EPOCH + timedelta(0, 0, value)
+        return record
+
+    def value(self, field: str) -> Callable[[tuple], Any]:
+        """Function returning the packed value of ``field`` from a row."""
+        return itemgetter(self.positions[field])
+
+    def values(self, *fields: str) -> Callable[[tuple], Tuple]:
+        """Function returning the packed values of ``fields`` from a row, as a tuple."""
+        if len(fields) == 1:
+            get = self.value(fields[0])
+            return lambda row: (get(row),)
+        return itemgetter(*(self.positions[field] for field in fields))
+
+    def replace(self, row: tuple, changes: dict) -> tuple:
+        unknown = changes.keys() - self.positions.keys()
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        values = list(row)
+        for field, value in changes.items():
+            i = self.positions[field]
+            if i in self._timestamps:
+                value = to_timestamp(value)
+            elif i in self._interned and type(value) is str:
+                value = sys.intern(value)
+            values[i] = value
+        return tuple(values)
+
+
+class SortedKeys:
+    """Ascending list of ``(created_at, id)`` keys, with ``created_at`` as stored by the layout."""
+
+    __slots__ = ("_keys",)
+
+    def __init__(self):
+        self._keys: List[Tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        return iter(self._keys)
+
+    def add(self, key: Tuple) -> None:
+        # Records almost always arrive newest-last, which is a plain append.
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+        else:
+            insort(self._keys, key)
+
+    def extend(self, keys: Iterable[Tuple]) -> None:
+        self._keys.extend(keys)
+        # Timsort is linear on the already-ordered runs this usually sees
+        self._keys.sort()
+
+    def remove(self, key: Tuple) -> None:
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def newest(self, before: Optional[Tuple] = None, after: Optional[Tuple] = None) -> Iterator[Tuple]:
+        """Yield keys in descending order, below ``before`` and above ``after`` if given."""
+        if before is None and after is None:
+            return reversed(self._keys)
+        end = len(self._keys) if before is None else bisect_left(self._keys, before)
+        stop = 0 if after is None else bisect_right(self._keys, after)
+        return self._descending(end, stop)
+
+    def oldest(self, after: Optional[Tuple] = None) -> Iterator[Tuple]:
+        """Yield keys in ascending order, starting above ``after`` if given."""
+        if after is None:
+            return iter(self._keys)
+        return self._ascending_from(bisect_right(self._keys, after))
+
+    def _ascending_from(self, start: int) -> Iterator[Tuple]:
+        keys = self._keys
+        for i in range(start, len(keys)):
+            yield keys[i]
+
+    def _descending(self, end: int, stop: int) -> Iterator[Tuple]:
+        keys = self._keys
+        for i in range(end - 1, stop - 1, -1):
+            yield keys[i]
+
+
+class Collection:
+    def __init__(
+        self,
+        indexes: Iterable[str] = (),
+        order_by: Optional[str] = "created_at",
+        fields: Optional[Iterable[str]] = None,
+        interned: Iterable[str] = (),
+        timestamps: Iterable[str] = (),
+    ):
+        self._layout = RecordLayout(fields, interned, timestamps) if fields is not None else DictLayout()
+        # id -> packed row
+        self._rows: Dict[str, Any] = {}
+        self._order_by = order_by
+        self._id = self._layout.value("id")
+        self._row_key = self._layout.values("id") if order_by is None else self._layout.values(order_by, "id")
+        self._order = SortedKeys()
+        # field -> value -> keys of the records holding that value
+        self._indexes: Dict[str, Dict[Any, SortedKeys]] = {field: {} for field in indexes}
+        self._getters = {field: self._layout.value(field) for field in indexes}
+        self._index_values = [(self._indexes[field], self._getters[field]) for field in indexes]
+        self._listeners: List[Listener] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[dict]:
+        return map(self._layout.unpack, self._rows.values())
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._rows
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, op: str, record: dict, changes: Optional[dict] = None) -> None:
+        for listener in self._listeners:
+            listener(op, record, changes)
+
+    @property
+    def layout(self):
+        return self._layout
+
+    def rows(self) -> List[Any]:
+        """
+        The packed rows, oldest first. Rows are replaced on update, never
+        changed in place, so the list stays a consistent copy that another
+        thread can read while the store moves on.
+        """
+        rows = self._rows
+        return [rows[key[-1]] for key in self._order]
+
+    def load_rows(self, fields: Iterable[str], timestamps: Iterable[str], rows: Iterable[list]) -> None:
+        """
+        Insert rows as ``rows()`` returned them from a layout of ``fields``
+        (a snapshot), without going through dicts unless the layout changed.
+        """
+        layout = self._layout
+        fields = tuple(fields)
+        if fields != getattr(layout, "fields", None):
+            timestamps = tuple(timestamps)
+            records = []
+            for row in rows:
+                record = dict(zip(fields, row))
+                for field in timestamps:
+                    record[field] = from_timestamp(record[field])
+                records.append(record)
+            self.insert_many(records)
+            return
+        self._insert_rows([layout.repack(row) for row in rows])
+
+    def get(self, record_id: str) -> Optional[dict]:
+        row = self._rows.get(record_id)
+        return self._layout.unpack(row) if row is not None else None
+
+    def insert(self, record: dict) -> dict:
+        record_id = record["id"]
+        if record_id in self._rows:
+            raise KeyError(f"Duplicate id: {record_id}")
+        row = self._rows[record_id] = self._layout.pack(record)
+        key = self._row_key(row)
+        self._order.add(key)
+        for index, value in self._index_values:
+            index.setdefault(value(row), SortedKeys()).add(key)
+        self._notify("insert", record)
+        return record
+
+    def insert_many(self, records: Iterable[dict]) -> List[dict]:
+        """Insert a batch of records, re-sorting each key list once instead of per record."""
+        added = list(records)
+        pack = self._layout.pack
+        # Pack the whole batch first, so a record that fails leaves the collection as it was
+        self._insert_rows([pack(record) for record in added], added)
+        return added
+
+    def _insert_rows(self, rows: List[Any], records: Optional[List[dict]] = None) -> None:
+        """Store and index packed ``rows``, announcing ``records`` (or the rows unpacked) to listeners."""
+        ids = list(map(self._id, rows))
+        if len(set(ids)) != len(ids) or not self._rows.keys().isdisjoint(ids):
+            raise KeyError("Duplicate id in batch")
+        new_keys = list(map(self._row_key, rows))
+        index_keys = [(index, value, {}) for index, value in self._index_values]
+        for row, key in zip(rows, new_keys):
+            for _, value, keys in index_keys:
+                keys.setdefault(value(row), []).append(key)
+        self._rows.update(zip(ids, rows))
+        self._order.extend(new_keys)
+        for index, _, values in index_keys:
+            for value, keys in values.items():
+                index.setdefault(value, SortedKeys()).extend(keys)
+        if self._listeners:
+            for record in records if records is not None else map(self._layout.unpack, rows):
+                self._notify("insert", record)
+
+    def delete(self, record_id: str) -> Optional[dict]:
+        row = self._rows.pop(record_id, None)
+        if row is None:
+            return None
+        key = self._row_key(row)
+        self._order.remove(key)
+        for index, value in self._index_values:
+            self._unindex(index, value(row), key)
+        record = self._layout.unpack(row)
+        self._notify("delete", record)
+        return record
+
+    def update(self, record_id: str, **changes) -> Optional[dict]:
+        row = self._rows.get(record_id)
+        if row is None:
+            return None
+        if self._order_by in changes or "id" in changes:
+            raise ValueError("Ordering fields cannot be updated")
+        updated = self._rows[record_id] = self._layout.replace(row, changes)
+        key = self._row_key(row)
+        for index, value in self._index_values:
+            old, new = value(row), value(updated)
+            if old != new:
+                self._unindex(index, old, key)
+                index.setdefault(new, SortedKeys()).add(key)
+        record = self._layout.unpack(updated)
+        self._notify("update", record, changes)
+        return record
+
+    def oldest(self, field: Optional[str] = None, value: Any = None, after: Optional[Tuple] = None) -> Iterator[dict]:
+        """
+        Yield records oldest first, optionally only those whose indexed
+        ``field`` equals ``value`` and whose key sorts above ``after``.
+        A one-element ``after`` such as ``(since,)`` starts at that time.
+        """
+        keys = self._keys(field, value)
+        if keys is None:
+            return
+        rows, unpack = self._rows, self._layout.unpack
+        for key in keys.oldest(self._bound(after)):
+            yield unpack(rows[key[-1]])
+
+    def newest(
+        self,
+        field: Optional[str] = None,
+        value: Any = None,
+        before: Optional[Tuple] = None,
+        after: Optional[Tuple] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[dict]:
+        """
+        Yield records newest first, optionally only those whose indexed
+        ``field`` equals ``value`` (and every indexed field in ``where`` its
+        value) and whose key sorts below ``before`` and above ``after``.
+        A one-element bound such as ``(since,)`` bounds on the time alone.
+        """
+        keys, match = self._select(field, value, where)
+        if keys is None:
+            return
+        rows, unpack = self._rows, self._layout.unpack
+        for key in keys.newest(self._bound(before), self._bound(after)):
+            row = rows[key[-1]]
+            if match is None or match(row):
+                yield unpack(row)
+
+    def page(
+        self,
+        limit: int,
+        before: Optional[Tuple] = None,
+        field: Optional[str] = None,
+        value: Any = None,
+        after: Optional[Tuple] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[dict], Optional[Tuple]]:
+        """
+        Return up to ``limit`` records newest first plus the key to pass as
+        ``before`` for the next page (``None`` on the last page).
+        """
+        items = list(islice(self.newest(field, value, before, after, where), limit + 1))
+        if len(items) <= limit:
+            return items, None
+        items.pop()
+        return items, self.key(items[-1])
+
+    def find(self, field: str, value: Any) -> List[dict]:
+        """Return the records whose indexed ``field`` equals ``value``, newest first."""
+        return list(self.newest(field, value))
+
+    def find_one(self, field: str, value: Any) -> Optional[dict]:
+        return next(self.newest(field, value), None)
+
+    def _keys(self, field: Optional[str], value: Any) -> Optional[SortedKeys]:
+        if field is None:
+            return self._order
+        index = self._indexes.get(field)
+        if index is None:
+            raise KeyError(f"No index on field: {field}")
+        return index.get(value)
+
+    def _select(self, field: Optional[str], value: Any, where: Optional[Dict[str, Any]]):
+        """
+        The sorted keys to walk for these filters and a check for the rows
+        on them. With several filters the smallest index bucket is walked
+        and the other fields are compared on each row.
+        """
+        filters = dict(where or {})
+        if field is not None:
+            filters[field] = value
+        if not filters:
+            return self._order, None
+        buckets = {field: self._keys(field, value) for field, value in filters.items()}
+        if any(bucket is None for bucket in buckets.values()):
+            return None, None
+        walked = min(buckets, key=lambda field: len(buckets[field]))
+        checks = [(self._getters[field], value) for field, value in filters.items() if field != walked]
+        if not checks:
+            return buckets[walked], None
+        return buckets[walked], lambda row: all(get(row) == value for get, value in checks)
+
+    def _bound(self, key: Optional[Tuple]) -> Optional[Tuple]:
+        """A key as returned by ``key()`` in the form the sorted key lists hold."""
+        if key is None or self._order_by not in self._layout.timestamps:
+            return key
+        return (to_timestamp(key[0]), *key[1:])
+
+    def key(self, record: dict) -> Tuple:
+        if self._order_by is None:
+            return (record["id"],)
+        return (record[self._order_by], record["id"])
+
+    @staticmethod
+    def _unindex(index: Dict[Any, SortedKeys], value: Any, key: Tuple) -> None:
+        bucket = index.get(value)
+        if bucket is None:
+            return
+        bucket.remove(key)
+        if not bucket:
+            del index[value]
@@ -30,6 +30,10 @@ class EngineeringClassesAPITester:
             "timestamp": datetime.now().isoformat()
         })
 
+    def auth_headers(self):
+        """Bearer header for the admin-only endpoints, once test_admin_login has run"""
+        return {"Authorization": f"Bearer {self.admin_token}"} if self.admin_token else {}
+
     def test_api_root(self):
         """Test API root endpoint"""
         try:
@@ -92,7 +96,7 @@ class EngineeringClassesAPITester:
                 "duration": "4 years",
                 "features": ["Programming", "Data Structures", "Algorithms"]
             }
-            response = requests.post(f"{self.api_url}/courses", json=course_data, timeout=10)
+            response = requests.post(f"{self.api_url}/courses", json=course_data, headers=self.auth_headers(), timeout=10)
             success = response.status_code == 200
             details = f"POST Status: {response.status_code}"
             
@@ -107,7 +111,7 @@ class EngineeringClassesAPITester:
             # Test DELETE course if creation was successful
             if success and course_id:
                 try:
-                    delete_response = requests.delete(f"{self.api_url}/courses/{course_id}", timeout=10)
+                    delete_response = requests.delete(f"{self.api_url}/courses/{course_id}", headers=self.auth_headers(), timeout=10)
                     delete_success = delete_response.status_code == 200
                     delete_details = f"DELETE Status: {delete_response.status_code}"
                     self.log_test("DELETE Course", delete_success, delete_details)
@@ -142,7 +146,7 @@ class EngineeringClassesAPITester:
             
             # Test GET inquiries
             try:
-                get_response = requests.get(f"{self.api_url}/inquiries", timeout=10)
+                get_response = requests.get(f"{self.api_url}/inquiries", headers=self.auth_headers(), timeout=10)
                 get_success = get_response.status_code == 200
                 get_details = f"GET Status: {get_response.status_code}"
                 if get_success:
@@ -153,7 +157,7 @@ class EngineeringClassesAPITester:
                 # Test PATCH inquiry status if we have an inquiry
                 if get_success and inquiry_id:
                     try:
-                        patch_response = requests.patch(f"{self.api_url}/inquiries/{inquiry_id}?status=contacted", timeout=10)
+                        patch_response = requests.patch(f"{self.api_url}/inquiries/{inquiry_id}?status=contacted", headers=self.auth_headers(), timeout=10)
                         patch_success = patch_response.status_code == 200
                         patch_details = f"PATCH Status: {patch_response.status_code}"
                         self.log_test("PATCH Inquiry Status", patch_success, patch_details)
@@ -211,7 +215,7 @@ class EngineeringClassesAPITester:
                 "content": "This is a test notice for API testing",
                 "priority": "medium"
             }
-            response = requests.post(f"{self.api_url}/notices", json=notice_data, timeout=10)
+            response = requests.post(f"{self.api_url}/notices", json=notice_data, headers=self.auth_headers(), timeout=10)
             success = response.status_code == 200
             details = f"POST Status: {response.status_code}"
             
@@ -236,7 +240,7 @@ class EngineeringClassesAPITester:
                 # Test DELETE notice if creation was successful
                 if get_success and notice_id:
                     try:
-                        delete_response = requests.delete(f"{self.api_url}/notices/{notice_id}", timeout=10)
+                        delete_response = requests.delete(f"{self.api_url}/notices/{notice_id}", headers=self.auth_headers(), timeout=10)
                         delete_success = delete_response.status_code == 200
                         delete_details = f"DELETE Status: {delete_response.status_code}"
                         self.log_test("DELETE Notice", delete_success, delete_details)
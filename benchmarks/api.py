@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for the API.
+
+Drives the FastAPI ``app`` in process through httpx's ASGI transport (or, with
+``--uvicorn``, a local uvicorn server over HTTP), seeds the inquiries
+collection up to each requested size and reports throughput and
+p50/p95/p99 latency per endpoint. WhatsApp runs in simulation mode and
+nothing is written to ``backend/data``.
+
+    python benchmarks/api.py [--sizes 1000 10000 100000] [--requests 2000]
+                             [--concurrency 16] [--uvicorn] [--output api_benchmark_results.json]
+
+Results are written as JSON so runs can be diffed for regressions.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+ADMIN_USERNAME = "bench-admin"
+ADMIN_PASSWORD = "bench-password"
+
+# Set before the server module reads them. WhatsApp goes to simulation mode,
+# the journal is off and the inquiry limits cannot trip during a run.
+BENCH_ENV = {
+    "WHATSAPP_TOKEN": "",
+    "WHATSAPP_PHONE_NUMBER_ID": "",
+    "DATA_DIR": "",
+    "INQUIRY_IP_LIMIT": "1000000000",
+    "INQUIRY_PHONE_LIMIT": "1000000000",
+    "INQUIRY_DUPLICATE_WINDOW": "0",
+    "ADMIN_USERNAME": ADMIN_USERNAME,
+    "ADMIN_PASSWORD": ADMIN_PASSWORD,
+}
+
+COURSES = ["Diploma Mechanical", "Diploma Civil", "Degree Computer", "Degree Electrical"]
+
+_phones = itertools.count(1)
+
+
+def inquiry_payload() -> dict:
+    n = next(_phones)
+    return {
+        "name": f"Student {n}",
+        "phone": f"9{n:09d}",
+        "email": f"student{n}@example.com",
+        "course_interested": COURSES[n % len(COURSES)],
+        "message": "Please share the batch timings and fee structure.",
+    }
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> dict:
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, send: Callable, requests: int, concurrency: int) -> dict:
+    """Issue ``requests`` calls of ``send(client)`` from ``concurrency`` workers."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await send(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def login(client: httpx.AsyncClient) -> httpx.Response:
+    return await client.post("/api/admin/login", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+
+
+async def seed_inquiries(client: httpx.AsyncClient, token: str, target: int, batch: int = 10000) -> None:
+    """Top the inquiries collection up to ``target`` records through the bulk endpoint."""
+    count = await count_inquiries(client)
+    while count < target:
+        rows = [inquiry_payload() for _ in range(min(batch, target - count))]
+        body = "\n".join(json.dumps(row) for row in rows).encode()
+        response = await client.post(
+            "/api/inquiries/bulk",
+            params={"format": "ndjson", "notify": "none"},
+            content=body,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        response.raise_for_status()
+        count += response.json()["inserted"]
+
+
+async def count_inquiries(client: httpx.AsyncClient) -> int:
+    count, cursor = 0, None
+    while True:
+        params = {"limit": 500}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/inquiries", params=params)
+        count += len(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return count
+
+
+def endpoints(args) -> List[tuple]:
+    """(label, sender, request count) for each benchmarked endpoint."""
+    async def post_inquiry(client):
+        return await client.post("/api/inquiries", json=inquiry_payload())
+
+    async def list_inquiries(client):
+        return await client.get("/api/inquiries")
+
+    async def list_inquiries_max(client):
+        return await client.get("/api/inquiries", params={"limit": 500})
+
+    return [
+        ("POST /api/inquiries", post_inquiry, args.requests),
+        ("GET /api/inquiries", list_inquiries, args.requests),
+        ("GET /api/inquiries?limit=500", list_inquiries_max, args.requests),
+        # bcrypt dominates, so fewer requests give a stable figure
+        ("POST /api/admin/login", login, args.login_requests),
+    ]
+
+
+async def run_benchmarks(client: httpx.AsyncClient, args) -> List[dict]:
+    response = await login(client)
+    response.raise_for_status()
+    token = response.json()["token"]
+    # The inquiry list is admin-only
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    results = []
+    for size in sorted(args.sizes):
+        await seed_inquiries(client, token, size)
+        for label, send, requests in endpoints(args):
+            # Warm up connections and caches before measuring
+            await run_load(client, send, min(requests, args.concurrency), args.concurrency)
+            stats = await run_load(client, send, requests, args.concurrency)
+            results.append({"records": size, "endpoint": label, "concurrency": args.concurrency, **stats})
+            print(
+                f"{size:>7} records  {label:<30} {stats['throughput_rps']:>9.1f} req/s  "
+                f"p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms"
+                + (f"  errors {stats['errors']}" if stats["errors"] else "")
+            )
+    return results
+
+
+async def run_in_process(args) -> List[dict]:
+    os.environ.update(BENCH_ENV)
+    sys.path.insert(0, str(BACKEND_DIR))
+    from server import app
+
+    # Keep the per-inquiry simulated WhatsApp logs out of the timings
+    logging.disable(logging.INFO)
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            return await run_benchmarks(client, args)
+    finally:
+        await app.router.shutdown()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args) -> List[dict]:
+    port = args.port or free_port()
+    command = [
+        sys.executable, "-m", "uvicorn", "server:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    # Server output (including the simulated WhatsApp messages) goes to a log file
+    log = tempfile.NamedTemporaryFile(prefix="uvicorn-", suffix=".log", delete=False)
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **BENCH_ENV}, stdout=log, stderr=log)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0, limits=limits) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    (await client.get("/api/")).raise_for_status()
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError(f"uvicorn did not start, see {log.name}")
+                    await asyncio.sleep(0.2)
+            return await run_benchmarks(client, args)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint and size")
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--uvicorn", action="store_true", help="benchmark a local uvicorn server over HTTP")
+    parser.add_argument("--port", type=int, help="port for --uvicorn (default: any free port)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers; more than 1 needs STORAGE_BACKEND=sqlite")
+    parser.add_argument("--output", default="api_benchmark_results.json", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    mode = "uvicorn" if args.uvicorn else "asgi"
+    results = asyncio.run(run_uvicorn(args) if args.uvicorn else run_in_process(args))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "mode": mode,
+        "storage_backend": os.environ.get("STORAGE_BACKEND", "memory"),
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Memory per stored inquiry in the in-memory store: records kept as dicts
+(the layout before compact rows) against the tuple layout the server
+configures, at 1M records by default.
+
+    python benchmarks/memory.py [--sizes 1000000] [--output results.json]
+
+Bytes are Python allocations traced by ``tracemalloc`` for the collection,
+its ordering and its indexes, so the figures don't depend on the allocator.
+Also reported: how long a full garbage collection takes with the store
+loaded, and the best time to read a 500-record page.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import COLLECTIONS  # noqa: E402
+from store import Collection  # noqa: E402
+
+COURSES = ["Diploma Mechanical", "Diploma Civil", "Degree Computer", "Degree Electrical"]
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_records(count: int):
+    """Inquiries as the handlers store them, with strings decoded per request as they would be."""
+    for i in range(count):
+        record = orjson.loads(orjson.dumps({
+            "name": f"Student {i}",
+            "phone": f"9{i:09d}",
+            "email": f"student{i}@example.com",
+            "course_interested": COURSES[i % len(COURSES)],
+            "message": "Please share the batch timings and fee structure.",
+            "id": str(uuid.uuid4()),
+            "created_at": None,
+            "status": "new",
+        }))
+        record["created_at"] = START + timedelta(seconds=i)
+        yield record
+
+
+def measure(options: dict, count: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    collection = Collection(**options)
+    started = time.perf_counter()
+    collection.insert_many(make_records(count))
+    insert_s = time.perf_counter() - started
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # A full collection has to traverse every tracked container the store holds
+    started = time.perf_counter()
+    gc.collect()
+    gc_ms = (time.perf_counter() - started) * 1000
+
+    page_ms = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        page, _ = collection.page(500)
+        page_ms = min(page_ms, (time.perf_counter() - started) * 1000)
+    del collection, page
+    gc.collect()
+    return {
+        "bytes": used,
+        "bytes_per_record": round(used / count, 1),
+        "insert_s": round(insert_s, 2),
+        "gc_ms": round(gc_ms, 3),
+        "page_500_ms": round(page_ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    compact = COLLECTIONS["inquiries"]
+    layouts = {
+        "dict": {"indexes": compact["indexes"]},
+        "compact": compact,
+    }
+    results = []
+    for size in args.sizes:
+        sample = next(islice(make_records(1), 1))
+        for name, options in layouts.items():
+            collection = Collection(**options)
+            collection.insert(sample)
+            assert collection.get(sample["id"]) == sample
+            stats = measure(options, size)
+            results.append({"records": size, "layout": name, **stats})
+            print(
+                f"{size:>8} records  {name:<8} {stats['bytes_per_record']:>7.1f} B/record  "
+                f"{stats['bytes'] / 2 ** 20:8.1f} MiB  insert {stats['insert_s']:6.2f} s  "
+                f"full gc {stats['gc_ms']:8.2f} ms  500-record page {stats['page_500_ms']:6.2f} ms"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compare the list endpoints' fast encoding path against FastAPI's default
+``response_model`` path (validate every item, ``jsonable_encoder``, then
+``json.dumps``) for 1k/10k/100k-item lists.
+
+    python benchmarks/serialization.py [--sizes 1000 10000 100000] [--output results.json]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import encoding  # noqa: E402
+from server import Inquiry  # noqa: E402
+
+
+def make_records(count: int) -> List[dict]:
+    return [
+        Inquiry(
+            name=f"Student {i}",
+            phone=f"98{i:08d}",
+            email=f"student{i}@example.com",
+            course_interested="Diploma Mechanical",
+            message="Please share the batch timings and fee structure.",
+        ).model_dump()
+        for i in range(count)
+    ]
+
+
+def response_model_path(records: List[dict], adapter: TypeAdapter) -> bytes:
+    validated = adapter.validate_python(records)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_path(records: List[dict], adapter: TypeAdapter) -> bytes:
+    return encoding.dump_records(records)
+
+
+def best_of(fn, records, adapter, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(records, adapter)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[Inquiry])
+    results = []
+    for size in args.sizes:
+        records = make_records(size)
+        assert json.loads(response_model_path(records, adapter)) == json.loads(fast_path(records, adapter))
+        baseline = best_of(response_model_path, records, adapter, args.repeat)
+        fast = best_of(fast_path, records, adapter, args.repeat)
+        results.append({
+            "items": size,
+            "response_model_ms": round(baseline * 1000, 3),
+            "fast_path_ms": round(fast * 1000, 3),
+            "speedup": round(baseline / fast, 1),
+        })
+        print(f"{size:>7} items  response_model {baseline * 1000:9.2f} ms  fast {fast * 1000:8.2f} ms  x{baseline / fast:.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
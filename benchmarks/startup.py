@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of the API: how long ``import server`` takes in a fresh
+interpreter, and which packages that time goes to.
+
+    python benchmarks/startup.py [--runs 5] [--top 15] [--budget 600] [--output results.json]
+
+Each run imports the server in a new process and the best time is
+reported, followed by a per-package breakdown from ``python -X importtime``.
+With ``--budget MS`` the script exits non-zero when the best import takes
+longer, or when a module that is meant to load on first use (see
+``startup_profile.DEFERRED``) was imported anyway, so it can gate a CI job.
+``tests/test_startup.py`` runs the same checks with a looser default
+budget (``STARTUP_BUDGET_MS``) as part of the test suite.
+
+For the phases after the imports (app construction, storage load, startup
+hooks), run the server with ``STARTUP_PROFILE=1``.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from startup_profile import IMPORT_PROBE  # noqa: E402
+
+# WhatsApp in simulation mode and no journal, as in the other benchmarks
+ENV = {**os.environ, "WHATSAPP_TOKEN": "", "DATA_DIR": ""}
+
+
+def run_probe() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=ENV, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown() -> dict:
+    """Import time in ms per top-level package, each module counted by its own (self) time."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=ENV, capture_output=True, text=True, check=True,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the breakdown")
+    parser.add_argument("--budget", type=float, help="fail if the best import takes longer than this many ms")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    probes = [run_probe() for _ in range(args.runs)]
+    best_ms = min(probe["seconds"] for probe in probes) * 1000
+    deferred_loaded = sorted({module for probe in probes for module in probe["deferred_loaded"]})
+    packages = import_breakdown()
+
+    print(f"import server: best {best_ms:.1f} ms over {args.runs} runs")
+    print(f"deferred modules imported at startup: {', '.join(deferred_loaded) or 'none'}")
+    print("\nimport time by package (-X importtime, so inflated; 'server' is the module body itself):")
+    for package, ms in list(packages.items())[:args.top]:
+        print(f"  {package:<24} {ms:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "import_ms": round(best_ms, 1),
+                "deferred_loaded": deferred_loaded,
+                "packages": {package: round(ms, 1) for package, ms in packages.items()},
+            }, f, indent=2)
+
+    if args.budget is not None:
+        failures = []
+        if best_ms > args.budget:
+            failures.append(f"import took {best_ms:.1f} ms, budget is {args.budget:.0f} ms")
+        if deferred_loaded:
+            failures.append(f"imported at startup: {', '.join(deferred_loaded)}")
+        if failures:
+            print("\nFAIL: " + "; ".join(failures))
+            sys.exit(1)
+        print(f"\nOK: within the {args.budget:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,11 @@ import { toast } from 'sonner';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// The admin endpoints take the token from AdminLogin as a bearer token
+const authConfig = () => ({
+  headers: { Authorization: `Bearer ${localStorage.getItem('adminToken')}` }
+});
+
 const AdminDashboard = () => {
   const [activeTab, setActiveTab] = useState('inquiries');
   const [inquiries, setInquiries] = useState([]);
@@ -28,7 +33,7 @@ const AdminDashboard = () => {
   const fetchData = async () => {
     try {
       const [inquiriesRes, coursesRes, reviewsRes, noticesRes] = await Promise.all([
-        axios.get(`${API}/inquiries`),
+        axios.get(`${API}/inquiries`, authConfig()),
         axios.get(`${API}/courses`),
         axios.get(`${API}/reviews`),
         axios.get(`${API}/notices`)
@@ -40,6 +45,13 @@ const AdminDashboard = () => {
       setNotices(noticesRes.data);
     } catch (error) {
       console.error('Error fetching data:', error);
+      if (error.response?.status === 401) {
+        // Expired or revoked session
+        localStorage.removeItem('adminToken');
+        localStorage.removeItem('adminUser');
+        navigate('/admin/login');
+        return;
+      }
       toast.error('Failed to load data');
     } finally {
       setLoading(false);
@@ -47,6 +59,8 @@ const AdminDashboard = () => {
   };
 
   const handleLogout = () => {
+    // Revoke the session server-side too; the local logout doesn't wait for it
+    axios.post(`${API}/admin/logout`, null, authConfig()).catch(() => {});
     localStorage.removeItem('adminToken');
     localStorage.removeItem('adminUser');
     toast.success('Logged out successfully');
@@ -55,7 +69,7 @@ const AdminDashboard = () => {
 
   const updateInquiryStatus = async (inquiryId, status) => {
     try {
-      await axios.patch(`${API}/inquiries/${inquiryId}?status=${status}`);
+      await axios.patch(`${API}/inquiries/${inquiryId}?status=${status}`, null, authConfig());
       toast.success('Status updated');
       fetchData();
     } catch (error) {
@@ -68,7 +82,7 @@ const AdminDashboard = () => {
     if (!window.confirm('Are you sure you want to delete this course?')) return;
     
     try {
-      await axios.delete(`${API}/courses/${courseId}`);
+      await axios.delete(`${API}/courses/${courseId}`, authConfig());
       toast.success('Course deleted');
       fetchData();
     } catch (error) {
@@ -81,7 +95,7 @@ const AdminDashboard = () => {
     if (!window.confirm('Are you sure you want to delete this notice?')) return;
     
     try {
-      await axios.delete(`${API}/notices/${noticeId}`);
+      await axios.delete(`${API}/notices/${noticeId}`, authConfig());
       toast.success('Notice deleted');
       fetchData();
     } catch (error) {
@@ -0,0 +1,41 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# The backend modules import each other flat, as uvicorn runs them from backend/
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Keep the server module (imported by some tests) away from WhatsApp and backend/data
+os.environ.setdefault("WHATSAPP_TOKEN", "")
+os.environ.setdefault("DATA_DIR", "")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("INQUIRY_IP_LIMIT", "100000")
+os.environ.setdefault("INQUIRY_PHONE_LIMIT", "100000")
+os.environ.setdefault("INQUIRY_DUPLICATE_WINDOW", "0")
+os.environ.setdefault("ADMIN_USERNAME", "admin")
+os.environ.setdefault("ADMIN_PASSWORD", "admin123")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup hooks run, shared by the tests (so use distinct data per test)."""
+    from fastapi.testclient import TestClient
+
+    import server
+
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/admin/login", json={
+        "username": os.environ["ADMIN_USERNAME"],
+        "password": os.environ["ADMIN_PASSWORD"],
+    })
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['token']}"}
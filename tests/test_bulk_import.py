@@ -0,0 +1,16 @@
+def test_csv_rows_with_naive_created_at_are_taken_as_utc(client, admin_headers):
+    body = (
+        "name,phone,course_interested,created_at\n"
+        "Naive One,9000000001,Bulk Naive Course,2024-01-01 10:00:00\n"
+        "Naive Two,9000000002,Bulk Naive Course,2024-01-01 11:00:00\n"
+    )
+    response = client.post(
+        "/api/inquiries/bulk?format=csv&notify=none",
+        content=body,
+        headers={**admin_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+
+    response = client.get("/api/inquiries", params={"course_interested": "Bulk Naive Course"}, headers=admin_headers)
+    assert [inquiry["created_at"] for inquiry in response.json()] == ["2024-01-01T11:00:00Z", "2024-01-01T10:00:00Z"]
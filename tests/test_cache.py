@@ -0,0 +1,47 @@
+def add_course(client, admin_headers, stream: str, n: int) -> str:
+    response = client.post("/api/courses", headers=admin_headers, json={
+        "name": f"{stream} course {n}",
+        "stream": stream,
+        "type": "Degree",
+        "description": "Long enough that a few of these make a compressible body. " * 5,
+        "duration": "4 years",
+        "features": ["Labs", "Projects"],
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def get_courses(client, stream: str, **headers):
+    return client.get("/api/courses", params={"stream": stream}, headers={"Accept-Encoding": "identity", **headers})
+
+
+def test_if_none_match_gets_304(client, admin_headers):
+    add_course(client, admin_headers, "Cache 304", 1)
+    first = get_courses(client, "Cache 304")
+    assert first.status_code == 200
+    again = get_courses(client, "Cache 304", **{"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert again.content == b""
+
+
+def test_create_and_delete_drop_the_cached_entry(client, admin_headers):
+    import server
+
+    add_course(client, admin_headers, "Cache Writes", 1)
+    before = get_courses(client, "Cache Writes")
+    assert server.response_cache.get("courses", "Cache Writes") is not None
+
+    course_id = add_course(client, admin_headers, "Cache Writes", 2)
+    assert server.response_cache.get("courses", "Cache Writes") is None
+    created = get_courses(client, "Cache Writes", **{"If-None-Match": before.headers["ETag"]})
+    assert created.status_code == 200
+    assert created.headers["ETag"] != before.headers["ETag"]
+    assert course_id in {course["id"] for course in created.json()}
+
+    assert client.delete(f"/api/courses/{course_id}", headers=admin_headers).status_code == 200
+    deleted = get_courses(client, "Cache Writes")
+    assert deleted.headers["ETag"] != created.headers["ETag"]
+    # Back to the data of the first response, and the ETag follows the body
+    assert deleted.headers["ETag"] == before.headers["ETag"]
+    assert course_id not in {course["id"] for course in deleted.json()}
@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+
+from cache import variant_etag
+from compression import MINIMUM_SIZE, CompressionMiddleware
+from tests.test_cache import add_course, get_courses
+
+
+def test_each_encoding_gets_its_own_etag(client, admin_headers):
+    for n in range(5):
+        add_course(client, admin_headers, "Cache Variants", n)
+    identity = get_courses(client, "Cache Variants")
+    assert len(identity.content) >= MINIMUM_SIZE
+    etag = identity.headers["ETag"]
+    assert "content-encoding" not in identity.headers
+
+    for coding in ("gzip", "br"):
+        response = get_courses(client, "Cache Variants", **{"Accept-Encoding": coding})
+        assert response.headers["Content-Encoding"] == coding
+        assert response.headers["ETag"] == variant_etag(etag, coding)
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert response.json() == identity.json()
+        revalidated = get_courses(client, "Cache Variants", **{"Accept-Encoding": coding, "If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+
+def test_identity_for_refused_encodings_and_small_bodies(client, admin_headers):
+    for n in range(5):
+        add_course(client, admin_headers, "Cache Identity", n)
+    refused = get_courses(client, "Cache Identity", **{"Accept-Encoding": "gzip;q=0, br;q=0"})
+    assert "content-encoding" not in refused.headers
+
+    add_course(client, admin_headers, "Cache Small", 1)
+    small = get_courses(client, "Cache Small", **{"Accept-Encoding": "gzip, br"})
+    assert len(small.content) < MINIMUM_SIZE
+    assert "content-encoding" not in small.headers
+
+
+def respond(content_type: str, body: bytes, more_body: bool = False):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type.encode())]})
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+        if more_body:
+            await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+def fetch(app, accept_encoding: str = "gzip") -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=CompressionMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/", headers={"Accept-Encoding": accept_encoding})
+    return asyncio.run(run())
+
+
+def test_middleware_compresses_json_but_not_streams():
+    body = b'{"text": "' + b"x" * 2 * MINIMUM_SIZE + b'"}'
+    assert fetch(respond("application/json", body)).headers["content-encoding"] == "gzip"
+    for content_type in ("text/csv", "application/x-ndjson", "text/event-stream"):
+        response = fetch(respond(content_type, body))
+        assert "content-encoding" not in response.headers
+        assert response.content == body
+    # Streamed JSON goes out as it is too
+    assert "content-encoding" not in fetch(respond("application/json", body, more_body=True)).headers
+
+
+def test_csv_export_is_not_compressed(client, admin_headers):
+    response = client.get("/api/inquiries/export", headers={**admin_headers, "Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from events import EventHub
+
+
+def events_after(hub: EventHub, last_event_id, collections=None) -> list:
+    """The first batch ``follow()`` yields, as decoded payloads."""
+    async def first():
+        feed = hub.follow(last_event_id, collections)
+        try:
+            return await feed.__anext__()
+        finally:
+            await feed.aclose()
+    return [json.loads(event.data) for event in asyncio.run(first())]
+
+
+def hub_with(*names, history=1000) -> EventHub:
+    hub = EventHub(history=history)
+    for n, name in enumerate(names):
+        hub.publish(name, {"op": "insert", "id": f"r{n}"})
+    return hub
+
+
+def test_resumes_after_last_event_id():
+    hub = hub_with("inquiries", "reviews", "inquiries")
+    events = events_after(hub, f"{hub.epoch}-1")
+    assert [(event["version"], event["id"]) for event in events] == [(2, "r1"), (3, "r2")]
+
+
+def test_id_from_another_epoch_gets_a_reset():
+    hub = hub_with("inquiries")
+    (event,) = events_after(hub, "0000-1")
+    assert event["collection"] == "reset"
+
+
+def test_id_older_than_the_history_gets_a_reset():
+    hub = hub_with(*["inquiries"] * 5, history=2)
+    (event,) = events_after(hub, f"{hub.epoch}-1")
+    assert event["collection"] == "reset"
+    assert [event["version"] for event in events_after(hub, f"{hub.epoch}-3")] == [4, 5]
+
+
+def test_collections_filter():
+    hub = hub_with("courses", "inquiries", "notices", "inquiries")
+    events = events_after(hub, f"{hub.epoch}-0", {"inquiries"})
+    assert [event["id"] for event in events] == ["r1", "r3"]
+
+
+def test_feeds_reject_missing_and_unknown_tokens(client):
+    assert client.get("/api/events").status_code == 401
+    assert client.get("/api/events", params={"token": "not-a-token"}).status_code == 401
+    for path in ("/api/events", "/api/events?token=not-a-token"):
+        with pytest.raises(WebSocketDisconnect) as closed:
+            with client.websocket_connect(path) as websocket:
+                websocket.receive_text()
+        assert closed.value.code == 1008
+
+
+def test_websocket_resumes_with_collection_filter(client, admin_headers):
+    import server
+
+    token = admin_headers["Authorization"].split()[1]
+    last_event_id = f"{server.event_hub.epoch}-{server.event_hub.version}"
+    notice = client.post("/api/notices", headers=admin_headers, json={"title": "Feed", "content": "c", "priority": "low"}).json()
+    review = client.post("/api/reviews", json={"name": "Feed", "rating": 5, "comment": "c", "course": "Feed"}).json()
+
+    params = f"token={token}&last_event_id={last_event_id}&collections=reviews"
+    with client.websocket_connect(f"/api/events?{params}") as websocket:
+        event = websocket.receive_json()
+    assert (event["collection"], event["op"], event["id"]) == ("reviews", "insert", review["id"])
+    assert notice["id"] != event["id"]
+
+    with client.websocket_connect(f"/api/events?token={token}&last_event_id=0000-1") as websocket:
+        assert websocket.receive_json()["collection"] == "reset"
+
+
+def test_sse_frames_resume_after_last_event_id(client, admin_headers):
+    import server
+
+    token = admin_headers["Authorization"].split()[1]
+    last_event_id = f"{server.event_hub.epoch}-{server.event_hub.version}"
+    review = client.post("/api/reviews", json={"name": "Frames", "rating": 5, "comment": "c", "course": "Frames"}).json()
+
+    async def first_frames():
+        # Straight from the route: the test client would wait for the endless body to end
+        response = await server.stream_events(
+            token=None, last_event_id=None, collections="reviews",
+            authorization=f"Bearer {token}", last_event_id_header=last_event_id,
+        )
+        assert response.media_type == "text/event-stream"
+        frames = response.body_iterator
+        try:
+            return [await frames.__anext__(), await frames.__anext__()]
+        finally:
+            await frames.aclose()
+
+    retry, frame = asyncio.run(first_frames())
+    assert retry == b"retry: 3000\n\n"
+    lines = frame.decode().split("\n")
+    assert lines[0] == f"id: {server.event_hub.epoch}-{int(last_event_id.split('-')[1]) + 1}"
+    assert lines[1] == "event: reviews"
+    assert json.loads(lines[2][len("data: "):])["id"] == review["id"]
@@ -0,0 +1,21 @@
+import csv
+import io
+import json
+
+
+def test_csv_and_ndjson_exports_encode_timestamps_alike(client, admin_headers):
+    response = client.post("/api/inquiries", json={
+        "name": "Export Check", "phone": "9000000101", "course_interested": "Export Course",
+    })
+    assert response.status_code == 200
+    created = response.json()
+    assert created["created_at"].endswith("Z")
+
+    ndjson = client.get("/api/inquiries/export", params={"format": "ndjson"}, headers=admin_headers)
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    (exported,) = [row for row in rows if row["id"] == created["id"]]
+
+    response = client.get("/api/inquiries/export", params={"format": "csv"}, headers=admin_headers)
+    (csv_row,) = [row for row in csv.DictReader(io.StringIO(response.text)) if row["id"] == created["id"]]
+
+    assert csv_row["created_at"] == exported["created_at"] == created["created_at"]
@@ -0,0 +1,26 @@
+def get_home(client, **headers):
+    response = client.get("/api/home", headers={"Accept-Encoding": "identity", **headers})
+    assert response.status_code in (200, 304)
+    return response
+
+
+def test_home_is_rebuilt_after_course_and_review_writes(client, admin_headers):
+    before = get_home(client)
+    etag = before.headers["ETag"]
+    assert get_home(client, **{"If-None-Match": etag}).status_code == 304
+
+    course = client.post("/api/courses", headers=admin_headers, json={
+        "name": "Home Course", "stream": "Home Stream", "type": "Degree", "description": "d",
+        "duration": "1 year", "features": [],
+    }).json()
+    after_course = get_home(client, **{"If-None-Match": etag})
+    assert after_course.status_code == 200
+    assert after_course.headers["ETag"] != etag
+    assert [c["id"] for c in after_course.json()["courses"]["Home Stream"]] == [course["id"]]
+
+    review = client.post("/api/reviews", json={"name": "Home", "rating": 5, "comment": "c", "course": "Home Course"}).json()
+    after_review = get_home(client)
+    assert after_review.headers["ETag"] not in (etag, after_course.headers["ETag"])
+    home = after_review.json()
+    assert home["reviews"][0]["id"] == review["id"]
+    assert home["rating"]["count"] == before.json()["rating"]["count"] + 1
@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+
+from idempotency import IdempotencyMiddleware, IdempotencyStore
+from storage import SQLiteStorage
+
+
+class Endpoint:
+    """ASGI app answering POST /items with the statuses it is given, in turn."""
+
+    def __init__(self, *statuses: int, delay: float = 0.01):
+        self.statuses = list(statuses)
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        await receive()
+        self.calls += 1
+        status = self.statuses.pop(0)
+        await asyncio.sleep(self.delay)
+        body = b'{"call":%d}' % self.calls
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def post_all(endpoint: Endpoint, requests):
+    app = IdempotencyMiddleware(endpoint, IdempotencyStore(), paths=("/items",))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/items", content=body, headers={"Idempotency-Key": key}) for key, body in requests
+            ))
+
+    return asyncio.run(run())
+
+
+def test_concurrent_duplicates_run_once():
+    endpoint = Endpoint(201)
+    responses = post_all(endpoint, [("k", b"{}")] * 5)
+    assert endpoint.calls == 1
+    assert {response.json()["call"] for response in responses} == {1}
+    assert sum(response.headers.get("idempotent-replayed") == "true" for response in responses) == 4
+
+
+def test_waiters_run_themselves_when_the_first_request_fails():
+    endpoint = Endpoint(500, 201)
+    responses = post_all(endpoint, [("k", b"{}")] * 3)
+    assert [response.status_code for response in responses] == [500, 201, 201]
+    assert endpoint.calls == 2
+    assert "idempotent-replayed" not in responses[0].headers
+    assert "idempotent-replayed" not in responses[1].headers
+    assert responses[2].headers["idempotent-replayed"] == "true"
+
+
+def test_key_reused_with_another_body_is_rejected():
+    endpoint = Endpoint(201)
+    first, second = post_all(endpoint, [("k", b'{"a":1}'), ("k", b'{"a":2}')])
+    assert first.status_code == 201
+    assert second.status_code == 422
+    assert endpoint.calls == 1
+
+
+def post_to_workers(tmp_path, endpoints, delays):
+    """POST the same key to one worker per endpoint, sharing a SQLite file, after the given delays."""
+    async def run():
+        workers = []
+        for endpoint in endpoints:
+            storage = SQLiteStorage({}, str(tmp_path / "shared.db"), pool_size=1)
+            await storage.start()
+            store = IdempotencyStore(shared=storage, poll_interval=0.01)
+            workers.append((storage, IdempotencyMiddleware(endpoint, store, paths=("/items",))))
+
+        async def post(app, delay):
+            await asyncio.sleep(delay)
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post("/items", content=b"{}", headers={"Idempotency-Key": "k"})
+
+        try:
+            return await asyncio.gather(*(post(app, delay) for (_, app), delay in zip(workers, delays)))
+        finally:
+            for storage, _ in workers:
+                await storage.stop()
+
+    return asyncio.run(run())
+
+
+def test_retry_on_another_worker_is_replayed(tmp_path):
+    first, second = Endpoint(201), Endpoint(201)
+    responses = post_to_workers(tmp_path, [first, second], [0, 0.1])
+    assert (first.calls, second.calls) == (1, 0)
+    assert responses[1].json() == responses[0].json()
+    assert responses[1].headers["idempotent-replayed"] == "true"
+
+
+def test_retry_on_another_worker_waits_for_the_first_to_finish(tmp_path):
+    first, second = Endpoint(201, delay=0.3), Endpoint(201)
+    responses = post_to_workers(tmp_path, [first, second], [0, 0.05])
+    assert (first.calls, second.calls) == (1, 0)
+    assert responses[1].json() == responses[0].json()
+
+
+def test_retry_on_another_worker_runs_when_the_first_fails(tmp_path):
+    first, second = Endpoint(500, delay=0.2), Endpoint(201)
+    responses = post_to_workers(tmp_path, [first, second], [0, 0.05])
+    assert [response.status_code for response in responses] == [500, 201]
+    assert (first.calls, second.calls) == (1, 1)
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from tests.test_pagination import START, bulk_inquiries, range_row, walk
+
+
+def test_time_range_with_status_and_course_filters(client, admin_headers):
+    rows = [range_row(n, "Filter Course", "contacted" if n % 2 else "new", day=n) for n in range(6)]
+    rows.append(range_row(9, "Other Filter Course", "contacted", day=3))
+    bulk_inquiries(client, admin_headers, rows)
+    since, until = (START + timedelta(days=1)).isoformat(), (START + timedelta(days=5)).isoformat()
+
+    def names(**params):
+        items = walk(client, "/api/inquiries", {"since": since, "until": until, "limit": 1, **params}, admin_headers)
+        return [item["name"] for item in items]
+
+    assert names(course_interested="Filter Course") == ["Range 4", "Range 3", "Range 2", "Range 1"]
+    assert names(course_interested="Filter Course", status="contacted") == ["Range 3", "Range 1"]
+    assert names(status="contacted") == ["Range 9", "Range 3", "Range 1"]
+    # Without an offset the bounds are taken as UTC
+    assert names(course_interested="Filter Course", since=since[:-6]) == names(course_interested="Filter Course")
+
+
+def test_stats_follow_a_status_change(client, admin_headers):
+    bulk_inquiries(client, admin_headers, [
+        {**range_row(n, "Stats Course"), "created_at": f"2019-06-0{n + 1}T08:00:00Z"} for n in range(3)
+    ])
+    params = {"since": "2019-06-01", "until": "2019-07-01"}
+    stats = client.get("/api/inquiries/stats", params=params, headers=admin_headers).json()
+    assert stats["total"] == 3
+    assert [bucket["start"] for bucket in stats["buckets"]] == ["2019-06-01", "2019-06-02", "2019-06-03"]
+
+    (first,) = walk(client, "/api/inquiries", {"since": "2019-06-01T00:00:00Z", "until": "2019-06-02T00:00:00Z"}, admin_headers)
+    response = client.patch(f"/api/inquiries/{first['id']}", params={"status": "contacted"}, headers=admin_headers)
+    assert response.status_code == 200
+
+    stats = client.get("/api/inquiries/stats", params={**params, "bucket": "month"}, headers=admin_headers).json()
+    assert stats["status"] == {"new": 2, "contacted": 1}
+    (month,) = stats["buckets"]
+    assert month["start"] == "2019-06-01"
+    assert month["status"] == {"new": 2, "contacted": 1}
+    assert month["course"] == {"Stats Course": 3}
+    assert client.get("/api/inquiries/stats", params=params).status_code == 401
@@ -0,0 +1,63 @@
+import re
+
+# One sample line of the Prometheus text format: name, optional labels, value
+SAMPLE_RE = re.compile(
+    r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)'
+    r'(?:\{(?P<labels>[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*)\})?'
+    r' (?P<value>[-+]?(?:[0-9.]+(?:e[-+]?[0-9]+)?|Inf|NaN))$'
+)
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text: str) -> dict:
+    """Samples by metric name as ``[(labels, value)]``, checking every line and family as it goes."""
+    types, samples = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram"), line
+            types[name] = kind
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, f"not a Prometheus sample: {line!r}"
+        name = match["name"]
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+        assert family in types, f"sample without a TYPE: {line!r}"
+        samples.setdefault(name, []).append((dict(LABEL_RE.findall(match["labels"] or "")), float(match["value"])))
+    return samples
+
+
+def test_metrics_parse_and_label_by_route_template(client, admin_headers):
+    assert client.patch("/api/inquiries/metrics-raw-id", params={"status": "contacted"}, headers=admin_headers).status_code == 404
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = parse(response.text)
+
+    routes = {labels["route"] for labels, _ in samples["http_requests_total"]}
+    assert "/api/inquiries/{inquiry_id}" in routes
+    assert not any("metrics-raw-id" in route for route in routes)
+    (count,) = [
+        value for labels, value in samples["http_requests_total"]
+        if labels == {"method": "PATCH", "route": "/api/inquiries/{inquiry_id}", "status": "404"}
+    ]
+    assert count >= 1
+
+    buckets = [
+        (labels["le"], value) for labels, value in samples["http_request_duration_seconds_bucket"]
+        if labels["method"] == "PATCH" and labels["route"] == "/api/inquiries/{inquiry_id}"
+    ]
+    assert buckets[-1][0] == "+Inf"
+    assert [value for _, value in buckets] == sorted(value for _, value in buckets)
+    assert {labels["collection"] for labels, _ in samples["collection_records"]} >= {"courses", "inquiries"}
+
+
+def test_metrics_token_is_enforced(client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from notifications import InquiryAlert, NotificationOutbox, WhatsAppSender
+
+
+class StubWhatsApp:
+    """Local stand-in for the WhatsApp Cloud API answering with scripted statuses (then 200)."""
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stub.requests.append((time.monotonic(), self.path, json.loads(body)))
+                status = stub.statuses.pop(0) if stub.statuses else 200
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubWhatsApp()
+    monkeypatch.setenv("WHATSAPP_API_URL", stub.url)
+    monkeypatch.setenv("WHATSAPP_TOKEN", "test-token")
+    monkeypatch.setenv("WHATSAPP_PHONE_NUMBER_ID", "12345")
+    yield stub
+    stub.close()
+
+
+def alert(name="Stub Lead") -> InquiryAlert:
+    return InquiryAlert(name=name, phone="9000000401", email=None, course_interested="Stub Course", message=None)
+
+
+def deliver(messages, **options) -> NotificationOutbox:
+    """Send ``messages`` through a fresh outbox and stop it, which waits for the queue to drain."""
+    async def run():
+        sender = WhatsAppSender()
+        outbox = NotificationOutbox(sender, base_delay=0.05, **options)
+        await outbox.start()
+        for message in messages:
+            outbox.enqueue(message)
+        await outbox.stop()
+        await sender.aclose()
+        return outbox
+
+    return asyncio.run(run())
+
+
+def test_ok_response_counts_as_sent(stub):
+    outbox = deliver([alert()])
+    assert (outbox.sent, outbox.failed, outbox.retried) == (1, 0, 0)
+    ((_, path, payload),) = stub.requests
+    assert path == "/12345/messages"
+    assert payload["template"]["components"][0]["parameters"][0]["text"] == "Stub Lead"
+
+
+def test_server_errors_and_rate_limits_are_retried_with_backoff(stub):
+    stub.statuses = [500, 429]
+    outbox = deliver([alert()])
+    assert (outbox.sent, outbox.failed, outbox.retried) == (1, 0, 2)
+    times = [at for at, _, _ in stub.requests]
+    assert len(times) == 3
+    # base_delay, then twice that
+    assert times[1] - times[0] >= 0.05
+    assert times[2] - times[1] >= 0.1
+
+
+def test_client_errors_are_dead_lettered_without_retry(stub):
+    stub.statuses = [400]
+    outbox = deliver([alert()])
+    assert (outbox.sent, outbox.failed, outbox.retried) == (0, 1, 0)
+    assert len(stub.requests) == 1
+    (dead,) = outbox.dead_letters
+    assert dead["attempts"] == 1
+    assert dead["message"].name == "Stub Lead"
+
+
+def test_stop_drains_the_queue(stub):
+    outbox = deliver([alert(f"Lead {n}") for n in range(10)], concurrency=2)
+    assert outbox.sent == 10
+    assert outbox.stats()["queue_depth"] == 0
+    assert sorted(payload["template"]["components"][0]["parameters"][0]["text"] for _, _, payload in stub.requests) == sorted(
+        f"Lead {n}" for n in range(10)
+    )
+
+
+def test_stop_waits_for_pending_retries(stub):
+    stub.statuses = [503] * 3
+    outbox = deliver([alert()], max_attempts=3)
+    assert (outbox.sent, outbox.failed, outbox.retried) == (0, 1, 2)
+    assert len(stub.requests) == 3
@@ -0,0 +1,123 @@
+import asyncio
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from storage import MemoryStorage, SQLiteStorage
+
+START = datetime(2019, 3, 1, tzinfo=timezone.utc)
+
+
+def walk(client, path: str, params: dict, headers=None) -> list:
+    """Every item of a list endpoint, following X-Next-Cursor to the end."""
+    items, params = [], dict(params)
+    while True:
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        items.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+    keys = [(item["created_at"], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(keys)) == len(keys)
+    return items
+
+
+def bulk_inquiries(client, admin_headers, rows) -> None:
+    response = client.post(
+        "/api/inquiries/bulk",
+        params={"format": "ndjson", "notify": "none"},
+        content="\n".join(json.dumps(row) for row in rows),
+        headers=admin_headers,
+    )
+    assert response.json()["inserted"] == len(rows), response.text
+
+
+def range_row(n: int, course: str, status: str = "new", day: int = 0) -> dict:
+    return {
+        "name": f"Range {n}", "phone": f"91000{n:05d}", "course_interested": course, "status": status,
+        "created_at": (START + timedelta(days=day, hours=n)).isoformat(),
+    }
+
+
+def test_cursor_walks_every_list_to_the_end(client, admin_headers):
+    bulk_inquiries(client, admin_headers, [range_row(n, "Walk Course") for n in range(7)])
+    inquiries = walk(client, "/api/inquiries", {"course_interested": "Walk Course", "limit": 2}, admin_headers)
+    assert sorted(item["name"] for item in inquiries) == [f"Range {n}" for n in range(7)]
+
+    reviews = [client.post("/api/reviews", json={"name": "Walker", "rating": 4, "comment": "ok", "course": "Walk Course"}).json()["id"] for _ in range(5)]
+    notices = [client.post("/api/notices", headers=admin_headers, json={"title": f"Walk {n}", "content": "c", "priority": "low"}).json()["id"] for n in range(5)]
+    assert set(reviews) <= {item["id"] for item in walk(client, "/api/reviews", {"limit": 2})}
+    assert set(notices) <= {item["id"] for item in walk(client, "/api/notices", {"limit": 2})}
+
+
+def cursor(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("path", ["/api/inquiries", "/api/reviews", "/api/notices"])
+def test_bad_cursors_and_oversized_pages_are_rejected(client, admin_headers, path):
+    for bad in ("not a cursor", cursor("2024-01-01T00:00:00|some-id"), cursor("no separator")):
+        assert client.get(path, params={"cursor": bad}, headers=admin_headers).status_code == 400
+    assert client.get(path, params={"limit": 501}, headers=admin_headers).status_code == 422
+    assert client.get(path, params={"limit": 500}, headers=admin_headers).status_code == 200
+
+
+# The same queries straight against each backend, as SQLite builds its own SQL for them
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    from server import COLLECTIONS
+
+    if request.param == "sqlite":
+        return SQLiteStorage(COLLECTIONS, str(tmp_path / "pages.db"), pool_size=1)
+    return MemoryStorage(COLLECTIONS, None)
+
+
+def test_backends_page_alike(storage):
+    records = [
+        {
+            "id": f"i{n}", "name": f"N{n}", "phone": "9000000000", "email": None, "message": None,
+            "course_interested": "A" if n % 3 else "B", "status": "contacted" if n % 2 else "new",
+            # Pairs share a timestamp, so ties are broken by id
+            "created_at": START + timedelta(hours=n // 2),
+        }
+        for n in range(12)
+    ]
+    key = lambda record: (record["created_at"], record["id"])
+    newest = sorted(records, key=key, reverse=True)
+
+    async def walk_pages(limit, **query):
+        ids, before = [], query.pop("before", None)
+        while True:
+            items, before = await storage.page("inquiries", limit, before, **query)
+            ids.extend(item["id"] for item in items)
+            if before is None:
+                return ids
+
+    async def run():
+        await storage.start()
+        try:
+            await storage.insert_many("inquiries", records)
+            assert await walk_pages(5) == [r["id"] for r in newest]
+            assert await walk_pages(2, field="status", value="new") == [r["id"] for r in newest if r["status"] == "new"]
+
+            since, until = START + timedelta(hours=1), START + timedelta(hours=4)
+            expected = [
+                r["id"] for r in newest
+                if since <= r["created_at"] < until and r["status"] == "contacted" and r["course_interested"] == "A"
+            ]
+            got = await walk_pages(1, before=(until,), after=(since,), where={"status": "contacted", "course_interested": "A"})
+            assert got == expected and expected
+
+            oldest = await storage.scan("inquiries", "course_interested", "B", after=key(newest[-1]), limit=3)
+            assert [r["id"] for r in oldest] == [r["id"] for r in reversed(newest[:-1]) if r["course_interested"] == "B"][:3]
+            assert (await storage.get("inquiries", "i5"))["created_at"] == records[5]["created_at"]
+        finally:
+            await storage.stop()
+
+    asyncio.run(run())
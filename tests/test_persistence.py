@@ -0,0 +1,205 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from persistence import Journal
+from store import Collection
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def record(i: int) -> dict:
+    return {"id": f"r{i}", "name": f"Student {i}", "status": "new", "created_at": START + timedelta(seconds=i)}
+
+
+def open_store(directory, **options):
+    db = {"inquiries": Collection(indexes=("status",))}
+    journal = Journal(str(directory), **options)
+    journal.load(db)
+    return db["inquiries"], journal
+
+
+def test_failed_write_is_retried(tmp_path):
+    async def run():
+        inquiries, journal = open_store(tmp_path, retry_interval=0.01)
+        await journal.start()
+        write = journal._write
+        failures = []
+
+        def failing_write(data):
+            if not failures:
+                failures.append(data)
+                raise OSError("No space left on device")
+            write(data)
+
+        journal._write = failing_write
+        inquiries.insert(record(1))
+        with pytest.raises(OSError):
+            await journal.commit()
+        # The entry stayed queued and the flusher is still alive
+        inquiries.insert(record(2))
+        await journal.commit()
+        assert not journal._flusher.done()
+        await journal.stop()
+
+    asyncio.run(run())
+    inquiries, _ = open_store(tmp_path)
+    assert [r["id"] for r in inquiries.oldest()] == ["r1", "r2"]
+
+
+def test_failed_snapshot_keeps_flusher_running(tmp_path):
+    async def run():
+        inquiries, journal = open_store(tmp_path, snapshot_every=2)
+        await journal.start()
+
+        def failing_snapshot(*args):
+            raise OSError("No space left on device")
+
+        journal._write_snapshot = failing_snapshot
+        for i in range(5):
+            inquiries.insert(record(i))
+            await asyncio.wait_for(journal.commit(), 5)
+        assert not journal._flusher.done()
+        del journal._write_snapshot
+        await journal.stop()
+
+    asyncio.run(run())
+    inquiries, _ = open_store(tmp_path)
+    assert len(inquiries) == 5
+
+
+async def crash(journal: Journal) -> None:
+    """Stop without the final flush and snapshot, as a killed process would."""
+    journal._flusher.cancel()
+    await asyncio.gather(journal._flusher, return_exceptions=True)
+    await journal._run_io(journal._close_segment)
+
+
+def test_log_is_replayed_after_a_crash(tmp_path):
+    async def run():
+        inquiries, journal = open_store(tmp_path)
+        await journal.start()
+        inquiries.insert_many([record(1), record(2), record(3)])
+        inquiries.update("r2", status="contacted")
+        inquiries.delete("r3")
+        await journal.commit()
+        await crash(journal)
+
+    asyncio.run(run())
+    inquiries, journal = open_store(tmp_path)
+    assert journal.seq == 5
+    assert [r["id"] for r in inquiries.oldest()] == ["r1", "r2"]
+    assert [r["id"] for r in inquiries.newest("status", "contacted")] == ["r2"]
+    assert inquiries.get("r1")["created_at"] == record(1)["created_at"]
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    async def run():
+        inquiries, journal = open_store(tmp_path)
+        await journal.start()
+        inquiries.insert(record(1))
+        await journal.commit()
+        await crash(journal)
+
+    asyncio.run(run())
+    (segment,) = tmp_path.glob("wal-*.log")
+    intact = segment.read_bytes()
+    with open(segment, "ab") as f:
+        f.write(b'{"s":2,"c":"inquiries","op":"ins')
+
+    inquiries, journal = open_store(tmp_path)
+    assert [r["id"] for r in inquiries.oldest()] == ["r1"]
+    assert segment.read_bytes() == intact
+
+    async def append():
+        await journal.start()
+        inquiries.insert(record(2))
+        await journal.commit()
+        await crash(journal)
+
+    asyncio.run(append())
+    inquiries, _ = open_store(tmp_path)
+    assert [r["id"] for r in inquiries.oldest()] == ["r1", "r2"]
+
+
+def test_commits_continue_during_snapshot(tmp_path):
+    async def run():
+        inquiries, journal = open_store(tmp_path)
+        await journal.start()
+        inquiries.insert_many(record(i) for i in range(2000))
+        await journal.commit()
+        snapshot = asyncio.create_task(journal.snapshot())
+        await asyncio.sleep(0)
+        for i in range(2000, 2010):
+            inquiries.insert(record(i))
+            await journal.commit()
+        await snapshot
+        inquiries.update("r0", status="contacted")
+        await journal.commit()
+        await crash(journal)
+
+    asyncio.run(run())
+    assert len(list(tmp_path.glob("wal-*.log"))) == 1
+    inquiries, journal = open_store(tmp_path)
+    assert len(inquiries) == 2010
+    assert journal.seq == 2011
+    assert inquiries.get("r0")["status"] == "contacted"
+
+
+def test_snapshot_stores_packed_rows(tmp_path):
+    layout = {"fields": ("id", "name", "status", "created_at"), "interned": ("status",), "timestamps": ("created_at",)}
+
+    async def run():
+        db = {"inquiries": Collection(indexes=("status",), **layout)}
+        journal = Journal(str(tmp_path))
+        journal.load(db)
+        await journal.start()
+        db["inquiries"].insert_many(record(i) for i in range(3))
+        await journal.stop()
+
+    asyncio.run(run())
+    snapshot = (tmp_path / "snapshot.json").read_text()
+    assert '"rows":[["r0","Student 0","new",1735689600000000]' in snapshot
+
+    db = {"inquiries": Collection(indexes=("status",), **layout)}
+    Journal(str(tmp_path)).load(db)
+    assert [r["id"] for r in db["inquiries"].newest("status", "new")] == ["r2", "r1", "r0"]
+    assert db["inquiries"].get("r1") == record(1)
+
+
+def test_loads_record_snapshots(tmp_path):
+    (tmp_path / "snapshot.json").write_text(
+        '{"seq": 1, "collections": {"inquiries": '
+        '[{"id": "r1", "name": "Student 1", "status": "new", "created_at": "2025-01-01T00:00:01+00:00"}]}}'
+    )
+    inquiries, journal = open_store(tmp_path)
+    assert journal.seq == 1
+    assert inquiries.get("r1") == record(1)
+
+
+def test_inquiry_alert_is_queued_when_the_journal_write_fails(client, monkeypatch):
+    import server
+    from ratelimit import DuplicateDetector
+
+    commit = server.storage.journal.commit
+    failures = [OSError("disk full")]
+
+    async def failing_commit():
+        if failures:
+            raise failures.pop()
+        await commit()
+
+    alerts = []
+    monkeypatch.setattr(server, "inquiry_duplicates", DuplicateDetector(600))
+    monkeypatch.setattr(server.notification_outbox, "enqueue", alerts.append)
+    monkeypatch.setattr(server.storage.journal, "commit", failing_commit)
+    inquiry = {"name": "Journal Lead", "phone": "9000000501", "course_interested": "Journal Course"}
+    with pytest.raises(OSError):
+        client.post("/api/inquiries", json=inquiry)
+
+    # The record stayed; the client's retry gets it back without a second alert
+    (alert,) = alerts
+    retry = client.post("/api/inquiries", json=inquiry)
+    assert retry.json()["id"] == alert.id
+    assert len(alerts) == 1
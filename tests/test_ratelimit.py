@@ -0,0 +1,81 @@
+import pytest
+
+from ratelimit import DuplicateDetector, TokenBucketLimiter, normalize_phone
+
+
+def inquiry(phone: str, course: str) -> dict:
+    return {"name": "Rate Check", "phone": phone, "course_interested": course}
+
+
+def test_phone_limit_answers_429_with_retry_after(client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "inquiry_phone_limiter", TokenBucketLimiter(2, 60))
+    # Formatted differently, but the same number
+    for phone, course in (("+91 98765 43210", "Limit A"), ("9876543210", "Limit B")):
+        assert client.post("/api/inquiries", json=inquiry(phone, course)).status_code == 200
+    response = client.post("/api/inquiries", json=inquiry("098765-43210", "Limit C"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+
+
+def test_ip_limit_ignores_client_written_forwarded_for(client, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "TRUSTED_PROXY_HOPS", 1)
+    monkeypatch.setattr(server, "inquiry_ip_limiter", TokenBucketLimiter(1, 60))
+    statuses = [
+        client.post(
+            "/api/inquiries",
+            json=inquiry(f"90000002{n:02d}", "Forwarded"),
+            headers={"X-Forwarded-For": f"10.0.0.{n}, 203.0.113.7"},
+        ).status_code
+        for n in range(3)
+    ]
+    assert statuses == [200, 429, 429]
+
+
+def test_repeat_submission_folds_into_the_first_record(client, monkeypatch):
+    import server
+
+    alerts = []
+    monkeypatch.setattr(server, "inquiry_duplicates", DuplicateDetector(600))
+    monkeypatch.setattr(server.notification_outbox, "enqueue", alerts.append)
+    first = client.post("/api/inquiries", json=inquiry("+91 90000 00301", "Fold Course"))
+    repeat = client.post("/api/inquiries", json=inquiry("9000000301", " fold course "))
+    assert first.status_code == repeat.status_code == 200
+    assert repeat.json()["id"] == first.json()["id"]
+    assert [alert.id for alert in alerts] == [first.json()["id"]]
+
+
+def test_normalize_phone_drops_formatting_and_country_code():
+    assert normalize_phone("+91 98765-43210") == normalize_phone("(98765) 43210") == "9876543210"
+    assert normalize_phone("12345") == "12345"
+
+
+def test_limiter_evicts_least_recently_used_key_past_max_keys():
+    limiter = TokenBucketLimiter(1, 60, max_keys=2)
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("a") > 0
+    limiter.acquire("c")
+    assert len(limiter) == 2
+    assert limiter.acquire("a") > 0
+    # "b" was evicted, so it starts again with a full bucket
+    assert limiter.acquire("b") == 0
+
+
+def test_zero_limit_disables_the_limiter():
+    limiter = TokenBucketLimiter(0, 60)
+    assert all(limiter.acquire("a") == 0 for _ in range(5))
+    with pytest.raises(ValueError):
+        TokenBucketLimiter(-1, 60)
+
+
+def test_duplicate_detector_evicts_oldest_key_past_max_keys():
+    detector = DuplicateDetector(600, max_keys=2)
+    for key in ("a", "b", "c"):
+        detector.remember(key, f"id-{key}")
+    assert len(detector) == 2
+    assert detector.get("a") is None
+    assert detector.get("c") == "id-c"
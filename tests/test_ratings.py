@@ -0,0 +1,37 @@
+from ratings import RatingStats
+from store import Collection
+
+
+class Storage:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def subscribe(self, name, listener):
+        self.collections[name].subscribe(listener)
+
+
+def test_out_of_range_ratings_are_not_counted():
+    reviews = Collection(indexes=("approved", "course"))
+    stats = RatingStats()
+    stats.watch(Storage(reviews=reviews))
+    reviews.insert({"id": "a", "course": "Civil", "rating": 5, "approved": True, "created_at": None})
+    reviews.insert({"id": "b", "course": "Civil", "rating": 9, "approved": True, "created_at": None})
+    reviews.insert({"id": "c", "course": "Civil", "rating": 3, "approved": False, "created_at": None})
+
+    overall = stats.get()
+    assert overall["count"] == sum(overall["histogram"].values()) == 1
+    assert overall["mean"] == 5.0
+
+    reviews.update("c", approved=True)
+    reviews.update("a", rating=1)
+    civil = stats.get("Civil")
+    assert civil["count"] == 2 and civil["mean"] == 2.0
+    assert civil["histogram"] == {"1": 1, "2": 0, "3": 1, "4": 0, "5": 0}
+
+
+def test_api_rejects_out_of_range_ratings(client):
+    review = {"name": "Range", "comment": "c", "course": "Rating Range Course"}
+    assert client.post("/api/reviews", json={**review, "rating": 9}).status_code == 422
+    assert client.post("/api/reviews", json={**review, "rating": 0}).status_code == 422
+    assert client.post("/api/reviews", json={**review, "rating": 5}).status_code == 200
+    assert client.get("/api/reviews/stats", params={"course": "Rating Range Course"}).json()["count"] == 1
@@ -0,0 +1,50 @@
+def add_course(client, admin_headers, name: str, description: str = "General engineering course") -> str:
+    response = client.post("/api/courses", headers=admin_headers, json={
+        "name": name, "stream": "Search", "type": "Degree", "description": description,
+        "duration": "4 years", "features": [],
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def search(client, q: str) -> list:
+    response = client.get("/api/search", params={"q": q})
+    assert response.status_code == 200
+    return [(result["type"], result["item"]["id"]) for result in response.json()["results"]]
+
+
+def test_query_tokens_match_as_prefixes(client, admin_headers):
+    course_id = add_course(client, admin_headers, "Zorblaxian Thermodynamics")
+    assert search(client, "zorbl") == [("course", course_id)]
+    assert search(client, "ZORBLAXIAN thermo") == [("course", course_id)]
+    assert search(client, "zorblaxianx") == []
+
+
+def test_more_matched_tokens_then_field_weight_rank_first(client, admin_headers):
+    in_description = add_course(client, admin_headers, "Quixel Basics", "Covers the quixotic method")
+    in_name = add_course(client, admin_headers, "Quixotic Design")
+    both = add_course(client, admin_headers, "Quixotic Vortexology")
+    assert search(client, "quixotic vortexology") == [("course", both), ("course", in_name), ("course", in_description)]
+
+
+def test_deleted_records_leave_the_index(client, admin_headers):
+    course_id = add_course(client, admin_headers, "Glimmerfold Surveying")
+    assert search(client, "glimmerfold") == [("course", course_id)]
+    assert client.delete(f"/api/courses/{course_id}", headers=admin_headers).status_code == 200
+    assert search(client, "glimmerfold") == []
+
+
+def test_unapproved_reviews_are_hidden(client, admin_headers):
+    review = client.post("/api/reviews", json={
+        "name": "Searcher", "rating": 4, "comment": "Flibbertigibbet lectures", "course": "Search",
+    }).json()
+    assert search(client, "flibbertigibbet") == [("review", review["id"])]
+
+    def approve(approved: bool) -> None:
+        response = client.patch(f"/api/reviews/{review['id']}", params={"approved": approved}, headers=admin_headers)
+        assert response.status_code == 200
+
+    approve(False)
+    assert search(client, "flibbertigibbet") == []
+    approve(True)
+    assert search(client, "flibbertigibbet") == [("review", review["id"])]
@@ -0,0 +1,53 @@
+import asyncio
+
+from auth import SessionStore
+from storage import SESSIONS, SQLiteStorage
+
+COLLECTIONS = {"admins": {"indexes": ("username",), "order_by": None}}
+
+
+def test_logout_revokes_the_token_on_other_workers(tmp_path):
+    async def run():
+        path = str(tmp_path / "shared.db")
+        workers = []
+        for _ in range(2):
+            storage = SQLiteStorage(COLLECTIONS, path, pool_size=1, poll_interval=60)
+            sessions = SessionStore()
+            storage.subscribe(SESSIONS, lambda op, record, changes, sessions=sessions: sessions.revoke(record["id"]))
+            await storage.start()
+            workers.append((storage, sessions))
+        (first, first_sessions), (second, second_sessions) = workers
+
+        token, expires_at = first_sessions.issue("admin-id", "admin")
+        await first.save_session(token, "admin-id", "admin", expires_at)
+        second_sessions.put(token, *await second.load_session(token))
+        assert second_sessions.get(token) is not None
+
+        first_sessions.revoke(token)
+        await first.delete_session(token)
+        await second._catch_up()
+        assert second_sessions.get(token) is None
+        assert await second.load_session(token) is None
+
+        for storage, _ in workers:
+            await storage.stop()
+
+    asyncio.run(run())
+
+
+def test_admin_routes_require_a_token(client, admin_headers):
+    course = {"name": "Guarded", "stream": "Guarded", "type": "Degree", "description": "d", "duration": "1 year", "features": []}
+    notice = {"title": "Guarded", "content": "c", "priority": "low"}
+    assert client.post("/api/courses", json=course).status_code == 401
+    assert client.post("/api/notices", json=notice).status_code == 401
+    assert client.get("/api/inquiries").status_code == 401
+    assert client.patch("/api/inquiries/missing", params={"status": "contacted"}).status_code == 401
+
+    course_id = client.post("/api/courses", json=course, headers=admin_headers).json()["id"]
+    notice_id = client.post("/api/notices", json=notice, headers=admin_headers).json()["id"]
+    assert client.delete(f"/api/courses/{course_id}").status_code == 401
+    assert client.delete(f"/api/notices/{notice_id}").status_code == 401
+    assert client.delete(f"/api/courses/{course_id}", headers=admin_headers).status_code == 200
+    assert client.delete(f"/api/notices/{notice_id}", headers=admin_headers).status_code == 200
+    assert client.get("/api/inquiries", headers=admin_headers).status_code == 200
+    assert client.patch("/api/inquiries/missing", params={"status": "contacted"}, headers=admin_headers).status_code == 404
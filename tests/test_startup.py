@@ -0,0 +1,51 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from startup_profile import IMPORT_PROBE
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Generous, as CI machines vary; benchmarks/startup.py reports the breakdown
+IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "2000"))
+
+
+def test_server_imports_within_budget_without_deferred_modules():
+    env = {**os.environ, "WHATSAPP_TOKEN": "", "DATA_DIR": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    assert probe["deferred_loaded"] == []
+    assert probe["seconds"] * 1000 < IMPORT_BUDGET_MS
+
+
+def test_failed_seed_is_logged_not_raised(monkeypatch):
+    import server
+
+    async def unavailable(*args):
+        raise OSError("storage unavailable")
+
+    monkeypatch.setattr(server.storage, "find_one", unavailable)
+    assert asyncio.run(server.seed_default_admin()) is False
+
+
+def test_login_retries_a_failed_seed(client, monkeypatch):
+    import server
+
+    loop = asyncio.new_event_loop()
+    failed = loop.create_future()
+    failed.set_result(False)
+    loop.close()
+    monkeypatch.setattr(server, "admin_seed", failed)
+
+    response = client.post("/api/admin/login", json={
+        "username": os.environ["ADMIN_USERNAME"],
+        "password": os.environ["ADMIN_PASSWORD"],
+    })
+    assert response.status_code == 200
+    assert server.admin_seed is not failed
+    assert server.admin_seed.result() is True
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from store import Collection
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def inquiries() -> Collection:
+    return Collection(
+        indexes=("status",),
+        fields=("id", "name", "status", "created_at"),
+        interned=("status",),
+        timestamps=("created_at",),
+    )
+
+
+def test_failed_insert_many_leaves_collection_unchanged():
+    collection = inquiries()
+    seen = []
+    collection.subscribe(lambda op, record, changes: seen.append(record["id"]))
+    good = {"id": "a", "name": "A", "status": "new", "created_at": START}
+    naive = {"id": "b", "name": "B", "status": "new", "created_at": datetime(2025, 1, 1, 10)}
+    with pytest.raises(TypeError):
+        collection.insert_many([good, naive])
+    assert len(collection) == 0
+    assert collection.get("a") is None
+    assert seen == []
+
+    collection.insert_many([good])
+    assert [record["id"] for record in collection.newest("status", "new")] == ["a"]
+
+
+def test_page_by_time_range():
+    collection = inquiries()
+    collection.insert_many(
+        {"id": f"r{i}", "name": "n", "status": "new", "created_at": START + timedelta(days=i)} for i in range(5)
+    )
+    page, next_key = collection.page(2, after=(START + timedelta(days=1),))
+    assert [record["id"] for record in page] == ["r4", "r3"]
+    page, next_key = collection.page(10, before=next_key, after=(START + timedelta(days=1),))
+    assert [record["id"] for record in page] == ["r2", "r1"]
+    assert next_key is None
+
+
+def test_load_rows_from_another_layout():
+    collection = inquiries()
+    collection.load_rows(
+        ("id", "status", "created_at", "name", "phone"),
+        ("created_at",),
+        [["r1", "new", 1735689600000000, "A", "9000000000"]],
+    )
+    assert collection.get("r1") == {"id": "r1", "name": "A", "status": "new", "created_at": START}
+    assert [record["id"] for record in collection.newest("status", "new")] == ["r1"]